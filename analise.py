@@ -0,0 +1,250 @@
+"""Análise do arquivo de orçamentos: valores por mês, por cliente e por material.
+
+Os backups JSON são compactados numa base SQLite em colunas (uma tabela de
+orçamentos e uma de itens, `backups/.analise.sqlite3`), atualizada só com os
+arquivos novos ou alterados desde a última varredura, como o índice do
+`BackupStore`. As tabelas são carregadas em DataFrames e as contas são feitas
+com group-bys do pandas, sem laço por orçamento.
+"""
+import os
+import json
+import sqlite3
+import threading
+from datetime import datetime
+
+import pandas as pd
+
+from backup_store import BACKUP_DIR, ESPERA_SQLITE
+from instrumentacao import etapa, contar
+
+ARQUIVO_ANALISE = ".analise.sqlite3"
+# Versão do esquema; se mudar, a base é recriada a partir dos JSON
+VERSAO_ANALISE = 2
+SEM_CLIENTE = "(sem nome)"
+SEM_MATERIAL = "(sem material)"
+# Colunas carregadas nos DataFrames (o nome e o preço unitário dos itens ficam só na base)
+COLUNAS_ORCAMENTOS = ('id', 'chave', 'valido', 'data', 'cliente_nome', 'projetos_nome', 'desconto', 'total',
+                      'valor_final', 'n_itens')
+COLUNAS_ITENS = ('orcamento', 'material', 'qtd', 'subtotal')
+
+
+def _numero(valor):
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _data(dados):
+    # Data do orçamento: a do PDF de origem (importados), senão a do último salvamento
+    # automático. Sem nenhuma das duas fica vazia, fora da série mensal: a data do
+    # arquivo, nos importados, seria a da migração
+    for campo in ('data_orcamento', 'salvo_em'):
+        try:
+            return datetime.fromisoformat(str(dados[campo])).date().isoformat()
+        except (KeyError, TypeError, ValueError):
+            continue
+    return ''
+
+
+def linhas_do_backup(chave, mtime_ns, dados):
+    """(linha da tabela de orçamentos, linhas da tabela de itens sem o id do orçamento) de um backup."""
+    if not isinstance(dados, dict):
+        # Arquivo corrompido: fica registrado, sem valores, para não ser relido a cada varredura
+        return (chave, mtime_ns, 0, '', '', '', 0.0, 0.0, 0.0, 0), []
+    itens = []
+    for item in dados.get('itens') or []:
+        if not isinstance(item, dict):
+            continue
+        qtd = _numero(item.get('Qtd'))
+        preco_unit = _numero(item.get('Preço Unit'))
+        subtotal = _numero(item['Subtotal']) if 'Subtotal' in item else qtd * preco_unit
+        itens.append((str(item.get('Item') or ''), str(item.get('Material') or '').strip(), qtd, preco_unit, subtotal))
+    total = sum(item[4] for item in itens)
+    desconto = _numero(dados.get('desconto'))
+    orcamento = (chave, mtime_ns, 1, _data(dados), str(dados.get('cliente_nome') or '').strip(),
+                 str(dados.get('projetos_nome') or '').strip(), desconto, total, total * (1 - desconto / 100), len(itens))
+    return orcamento, itens
+
+
+def _quadros(orcamentos, itens):
+    """DataFrames a partir das linhas (nas colunas de COLUNAS_ORCAMENTOS e COLUNAS_ITENS)."""
+    orcamentos = pd.DataFrame.from_records(orcamentos, columns=COLUNAS_ORCAMENTOS)
+    orcamentos = orcamentos[orcamentos.pop('valido') == 1].reset_index(drop=True)
+    # Sem data vira NaT: fica fora dos períodos e da série mensal
+    orcamentos['data'] = pd.to_datetime(orcamentos['data'], format='%Y-%m-%d', errors='coerce')
+    orcamentos['cliente_nome'] = orcamentos['cliente_nome'].replace('', SEM_CLIENTE)
+    itens = pd.DataFrame.from_records(itens, columns=COLUNAS_ITENS)
+    # Poucos materiais, muito repetidos: como categoria, o group-by não compara textos
+    itens['material'] = itens['material'].replace('', SEM_MATERIAL).astype('category')
+    return orcamentos, itens
+
+
+def _juntar(antigo, apagados, coluna, novo):
+    if apagados:
+        antigo = antigo[~antigo[coluna].isin(apagados)]
+    return antigo if novo.empty else pd.concat([antigo, novo], ignore_index=True)
+
+
+class BaseAnalise:
+    """Cópia em colunas dos backups para análise, invalidada pelo mtime de cada arquivo."""
+
+    def __init__(self, backup_dir=BACKUP_DIR):
+        self.backup_dir = backup_dir
+        self.versao = 0
+        self._tabelas = None
+        self._versao_dados = None
+        os.makedirs(backup_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(backup_dir, ARQUIVO_ANALISE), timeout=ESPERA_SQLITE,
+                                     check_same_thread=False)
+        # Como o índice dos backups: WAL, para as réplicas do app lerem e gravarem a mesma base
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            if self._conn.execute("PRAGMA user_version").fetchone()[0] != VERSAO_ANALISE:
+                self._conn.execute("DROP TABLE IF EXISTS orcamentos")
+                self._conn.execute("DROP TABLE IF EXISTS itens")
+                self._conn.execute(f"PRAGMA user_version = {VERSAO_ANALISE}")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS orcamentos (
+                    id INTEGER PRIMARY KEY,
+                    chave TEXT NOT NULL UNIQUE,
+                    mtime_ns INTEGER NOT NULL,
+                    valido INTEGER NOT NULL,
+                    data TEXT NOT NULL,
+                    cliente_nome TEXT NOT NULL,
+                    projetos_nome TEXT NOT NULL,
+                    desconto REAL NOT NULL,
+                    total REAL NOT NULL,
+                    valor_final REAL NOT NULL,
+                    n_itens INTEGER NOT NULL
+                )
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS itens (
+                    orcamento INTEGER NOT NULL,
+                    item TEXT NOT NULL,
+                    material TEXT NOT NULL,
+                    qtd REAL NOT NULL,
+                    preco_unit REAL NOT NULL,
+                    subtotal REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_itens_orcamento ON itens (orcamento)")
+
+    def _ler_arquivo(self, caminho):
+        try:
+            with open(caminho, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            print("Erro ao ler backup JSON:", os.path.basename(caminho), e)
+            return None
+
+    def sincronizar(self):
+        """Relê só os backups novos ou alterados e apaga os que sumiram."""
+        # Transação de escrita desde a leitura do que já está registrado: duas réplicas
+        # sincronizando ao mesmo tempo não registram o mesmo backup duas vezes
+        with self._lock, etapa("analise.sincronizar"), self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            versao_dados = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            if versao_dados != self._versao_dados:
+                # Outro processo mudou a base (ou é a primeira vez): os DataFrames são relidos
+                self._versao_dados = versao_dados
+                self._tabelas = None
+            registrados = {chave: (id_, mtime_ns) for id_, chave, mtime_ns in
+                           self._conn.execute("SELECT id, chave, mtime_ns FROM orcamentos")}
+            vistos = set()
+            novos = []
+            with os.scandir(self.backup_dir) as entradas:
+                for entrada in entradas:
+                    if not entrada.name.endswith(".json") or not entrada.is_file():
+                        continue
+                    chave = entrada.name[:-5]
+                    vistos.add(chave)
+                    mtime_ns = entrada.stat().st_mtime_ns
+                    if chave in registrados and registrados[chave][1] == mtime_ns:
+                        continue
+                    novos.append(linhas_do_backup(chave, mtime_ns, self._ler_arquivo(entrada.path)))
+            # Alterados saem e entram de novo, com um id novo para os itens
+            apagados = [registrados[chave][0] for chave in registrados.keys() - vistos]
+            apagados += [registrados[orcamento[0]][0] for orcamento, _ in novos if orcamento[0] in registrados]
+            contar("analise.relidos", len(novos))
+            if not (novos or apagados):
+                return
+            linhas_orcamentos, linhas_itens = [], []
+            self._conn.executemany("DELETE FROM itens WHERE orcamento = ?", [(id_,) for id_ in apagados])
+            self._conn.executemany("DELETE FROM orcamentos WHERE id = ?", [(id_,) for id_ in apagados])
+            for orcamento, itens in novos:
+                id_ = self._conn.execute(
+                    "INSERT INTO orcamentos (chave, mtime_ns, valido, data, cliente_nome, projetos_nome, desconto, "
+                    "total, valor_final, n_itens) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", orcamento).lastrowid
+                linhas_orcamentos.append((id_, orcamento[0]) + orcamento[2:])
+                linhas_itens.extend((id_,) + item for item in itens)
+            self._conn.executemany("INSERT INTO itens VALUES (?, ?, ?, ?, ?, ?)", linhas_itens)
+            self.versao += 1
+            if self._tabelas is not None:
+                # DataFrames já carregados recebem só a diferença, sem reler a base inteira
+                novos_orcamentos, novos_itens = _quadros(linhas_orcamentos,
+                                                         [(i[0], i[2], i[3], i[5]) for i in linhas_itens])
+                orcamentos, itens = self._tabelas
+                itens = _juntar(itens, apagados, 'orcamento', novos_itens)
+                if itens['material'].dtype != 'category':
+                    itens['material'] = itens['material'].astype('category')
+                self._tabelas = (_juntar(orcamentos, apagados, 'id', novos_orcamentos), itens)
+
+    def fechar(self):
+        with self._lock:
+            self._conn.close()
+
+    def tabelas(self):
+        """(orçamentos, itens) como DataFrames; a base é lida uma vez e depois só recebe as mudanças."""
+        with self._lock:
+            if self._tabelas is None:
+                with etapa("analise.carregar_tabelas"):
+                    self._versao_dados = self._conn.execute("PRAGMA data_version").fetchone()[0]
+                    self._tabelas = _quadros(
+                        self._conn.execute(f"SELECT {', '.join(COLUNAS_ORCAMENTOS)} FROM orcamentos").fetchall(),
+                        self._conn.execute(f"SELECT {', '.join(COLUNAS_ITENS)} FROM itens").fetchall())
+            return self._tabelas
+
+
+def filtrar_periodo(orcamentos, itens, inicio=None, fim=None, incluir_sem_data=False):
+    """Orçamentos (e os itens deles) com data entre `inicio` e `fim`, inclusive, e os sem data se pedido."""
+    selecao = pd.Series(True, index=orcamentos.index)
+    if inicio is not None:
+        selecao &= orcamentos['data'] >= pd.Timestamp(inicio)
+    if fim is not None:
+        selecao &= orcamentos['data'] <= pd.Timestamp(fim)
+    if incluir_sem_data:
+        selecao |= orcamentos['data'].isna()
+    orcamentos = orcamentos[selecao]
+    return orcamentos, itens[itens['orcamento'].isin(orcamentos['id'])]
+
+
+def resumo(orcamentos):
+    return {
+        'orcamentos': len(orcamentos),
+        'valor_orcado': float(orcamentos['valor_final'].sum()),
+        'ticket_medio': float(orcamentos['valor_final'].mean()) if len(orcamentos) else 0.0,
+        'desconto_medio': float(orcamentos['desconto'].mean()) if len(orcamentos) else 0.0,
+        'sem_data': int(orcamentos['data'].isna().sum()),
+    }
+
+
+def por_mes(orcamentos):
+    mes = orcamentos['data'].dt.to_period('M').dt.to_timestamp().rename('mes')
+    return orcamentos.groupby(mes).agg(orcamentos=('id', 'size'), valor_orcado=('valor_final', 'sum'),
+                                       desconto_medio=('desconto', 'mean'))
+
+
+def por_cliente(orcamentos, limite=20):
+    return (orcamentos.groupby('cliente_nome')
+            .agg(orcamentos=('id', 'size'), valor_orcado=('valor_final', 'sum'), ultimo=('data', 'max'))
+            .sort_values('valor_orcado', ascending=False).head(limite))
+
+
+def por_material(itens, limite=15):
+    return (itens.groupby('material', observed=True)
+            .agg(itens=('orcamento', 'size'), quantidade=('qtd', 'sum'), valor=('subtotal', 'sum'))
+            .sort_values('itens', ascending=False).head(limite))
@@ -0,0 +1,186 @@
+"""API HTTP local para gerar e ler orçamentos sem passar pela tela do Streamlit.
+
+    POST /orcamentos/pdf      JSON do orçamento (formato dos backups) -> PDF
+    POST /orcamentos/extrair  PDF (corpo application/pdf ou campo "arquivo" de um form) -> JSON
+    GET  /saude
+
+Usa o mesmo código do app (modelo_orcamento, pdf_orcamento, extracao_pdf). Os
+handlers são assíncronos e a renderização/extração roda num pool de threads, para
+uma requisição pesada não travar as outras. Precisa de starlette e uvicorn (já
+instalados com as versões recentes do Streamlit):
+
+    python orcamento_cli.py api --porta 8000
+"""
+import os
+import math
+import asyncio
+import contextlib
+import importlib.util
+from urllib.parse import quote
+from concurrent.futures import ThreadPoolExecutor
+
+from backup_store import BACKUP_DIR
+from extracao_pdf import pdfplumber_disponivel, CacheExtracao, DIRETORIO_CACHE_EXTRACAO
+from modelo_orcamento import Orcamento
+from pdf_orcamento import ModeloOrcamentoPDF, localizar_logo, nome_arquivo_pdf, EMPRESA_NOME_PADRAO, EMPRESA_ENDERECO_PADRAO
+
+# Tamanho dos pedaços enviados na resposta do PDF
+BLOCO_RESPOSTA = 64 * 1024
+# Maior PDF aceito em /orcamentos/extrair
+TAMANHO_MAXIMO_PDF = 50 * 1024 * 1024
+# Campos de texto do orçamento aceitos no JSON (além de itens e desconto)
+CAMPOS_TEXTO = ('empresa_nome', 'empresa_endereco', 'cliente_nome', 'cliente_telefone', 'cliente_endereco',
+                'projetos_nome', 'prazo', 'pagamento', 'orcamento_valido_por', 'observacao',
+                'itens_inclusos', 'itens_nao_inclusos')
+# Campos de cada item que precisam ser texto e os que precisam ser número (finito e não negativo)
+CAMPOS_TEXTO_ITEM = ('Item', 'Especificações', 'Material', 'Foto')
+CAMPOS_VALOR_ITEM = ('Preço Unit', 'Subtotal')
+
+
+def dependencias_disponiveis():
+    return all(importlib.util.find_spec(m) is not None for m in ("starlette", "uvicorn"))
+
+
+def _valor_valido(valor):
+    # bool também é int em Python, mas não é um preço
+    return isinstance(valor, (int, float)) and not isinstance(valor, bool) and math.isfinite(valor) and valor >= 0
+
+
+def validar_orcamento(corpo):
+    """Orçamento pronto para o PDF a partir do JSON recebido; ValueError com a explicação se for inválido."""
+    if not isinstance(corpo, dict):
+        raise ValueError("o corpo deve ser um objeto JSON")
+    dados = {'empresa_nome': EMPRESA_NOME_PADRAO, 'empresa_endereco': EMPRESA_ENDERECO_PADRAO}
+    for campo in CAMPOS_TEXTO:
+        if corpo.get(campo) is not None:
+            dados[campo] = str(corpo[campo])
+    itens = corpo.get('itens', [])
+    if not isinstance(itens, list):
+        raise ValueError("'itens' deve ser uma lista")
+    for n, item in enumerate(itens, 1):
+        if not isinstance(item, dict) or not item.get('Item') or 'Qtd' not in item:
+            raise ValueError(f"item {n}: 'Item' e 'Qtd' são obrigatórios")
+        if not isinstance(item['Qtd'], int) or isinstance(item['Qtd'], bool) or item['Qtd'] < 1:
+            raise ValueError(f"item {n}: 'Qtd' deve ser um inteiro positivo")
+        if 'Subtotal' not in item and 'Preço Unit' not in item:
+            raise ValueError(f"item {n}: informe 'Preço Unit' ou 'Subtotal'")
+        for campo in CAMPOS_TEXTO_ITEM:
+            if campo in item and not isinstance(item[campo], str):
+                raise ValueError(f"item {n}: '{campo}' deve ser texto")
+        for campo in CAMPOS_VALOR_ITEM:
+            if campo in item and not _valor_valido(item[campo]):
+                raise ValueError(f"item {n}: '{campo}' deve ser um número não negativo")
+    try:
+        dados['itens'] = Orcamento.de_dicts(itens)
+        dados['desconto'] = float(corpo.get('desconto') or 0)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"valor numérico inválido: {e}")
+    if not 0 <= dados['desconto'] <= 100:
+        raise ValueError("'desconto' deve estar entre 0 e 100")
+    return dados
+
+
+def criar_app(backup_dir=BACKUP_DIR, threads=4):
+    """Aplicação ASGI (Starlette) da API."""
+    if not dependencias_disponiveis():
+        raise RuntimeError("A API precisa de starlette e uvicorn. Instale com: pip install starlette uvicorn python-multipart")
+    from starlette.applications import Starlette
+    from starlette.responses import JSONResponse, StreamingResponse
+    from starlette.routing import Route
+
+    executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="api-orcamentos")
+    modelo = ModeloOrcamentoPDF(localizar_logo(backup_dir), backup_dir)
+    cache = CacheExtracao(diretorio=os.path.join(backup_dir, DIRETORIO_CACHE_EXTRACAO))
+
+    async def em_thread(funcao, *args):
+        return await asyncio.get_running_loop().run_in_executor(executor, funcao, *args)
+
+    def erro(mensagem, status=400):
+        return JSONResponse({'erro': mensagem}, status_code=status)
+
+    async def saude(request):
+        return JSONResponse({'ok': True, 'pdfplumber': pdfplumber_disponivel()})
+
+    async def gerar_pdf(request):
+        try:
+            corpo = await request.json()
+        except ValueError as e:
+            return erro(f"JSON inválido: {e}")
+        try:
+            dados = validar_orcamento(corpo)
+        except ValueError as e:
+            return erro(str(e))
+        try:
+            arquivo = await em_thread(modelo.gerar_pdf_temporario, dados)
+        except Exception as e:
+            return erro(f"não foi possível gerar o PDF: {e}", 422)
+
+        async def enviar():
+            try:
+                while True:
+                    bloco = await em_thread(arquivo.read, BLOCO_RESPOSTA)
+                    if not bloco:
+                        break
+                    yield bloco
+            finally:
+                arquivo.close()
+
+        nome = nome_arquivo_pdf(dados.get('cliente_nome', ''))
+        return StreamingResponse(enviar(), media_type="application/pdf",
+                                 headers={'Content-Disposition': f"attachment; filename*=UTF-8''{quote(nome)}",
+                                          'X-Valor-Final': f"{dados['itens'].valor_final(dados['desconto']):.2f}"})
+
+    async def extrair(request):
+        if not pdfplumber_disponivel():
+            return erro("pdfplumber não está instalado. Instale com: pip install pdfplumber", 503)
+        if request.headers.get('content-type', '').startswith('multipart/form-data'):
+            async with request.form(max_part_size=TAMANHO_MAXIMO_PDF) as form:
+                arquivo = form.get('arquivo')
+                if arquivo is None or isinstance(arquivo, str):
+                    return erro("envie o PDF no campo 'arquivo'")
+                conteudo = await arquivo.read()
+        else:
+            try:
+                tamanho = int(request.headers.get('content-length') or 0)
+            except ValueError:
+                return erro("cabeçalho Content-Length inválido")
+            if tamanho > TAMANHO_MAXIMO_PDF:
+                return erro("PDF grande demais", 413)
+            # Lido aos pedaços com limite: um envio sem Content-Length (chunked) não
+            # chega inteiro na memória antes de o tamanho ser conferido
+            partes, recebido = [], 0
+            async for bloco in request.stream():
+                recebido += len(bloco)
+                if recebido > TAMANHO_MAXIMO_PDF:
+                    return erro("PDF grande demais", 413)
+                partes.append(bloco)
+            conteudo = b"".join(partes)
+        if not conteudo.startswith(b'%PDF'):
+            return erro("o conteúdo enviado não é um PDF")
+        if len(conteudo) > TAMANHO_MAXIMO_PDF:
+            return erro("PDF grande demais", 413)
+        try:
+            dados = await em_thread(cache.extrair, conteudo)
+        except Exception as e:
+            return erro(f"não foi possível ler o PDF: {e}", 422)
+        return JSONResponse(dados)
+
+    @contextlib.asynccontextmanager
+    async def ciclo_de_vida(app):
+        yield
+        executor.shutdown(wait=False)
+
+    return Starlette(
+        routes=[
+            Route("/saude", saude, methods=["GET"]),
+            Route("/orcamentos/pdf", gerar_pdf, methods=["POST"]),
+            Route("/orcamentos/extrair", extrair, methods=["POST"]),
+        ],
+        lifespan=ciclo_de_vida,
+    )
+
+
+def servir(host="127.0.0.1", porta=8000, backup_dir=BACKUP_DIR, threads=4):
+    app = criar_app(backup_dir, threads)
+    import uvicorn
+    uvicorn.run(app, host=host, port=porta)
@@ -0,0 +1,318 @@
+import os
+import json
+import time
+import zlib
+import atexit
+import sqlite3
+import threading
+import contextlib
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from instrumentacao import etapa, contar
+
+# Diretório para backups
+BACKUP_DIR = "backups"
+# Índice persistente dos backups (fica junto dos JSON, mas não termina em .json)
+INDICE_ARQUIVO = ".indice.sqlite3"
+# Versão do esquema do índice; se mudar, o índice é recriado a partir dos JSON
+VERSAO_INDICE = 3
+# Campos de cada backup guardados no índice (usados na busca do painel de restauração)
+CAMPOS_INDICE = ('cliente_nome', 'cliente_telefone', 'cliente_endereco', 'projetos_nome')
+# Quanto um processo espera (s) quando outro está gravando no mesmo SQLite
+ESPERA_SQLITE = 30
+# Varredura completa do diretório no máximo a cada tantos segundos; entre uma e outra,
+# as gravações feitas por outros processos chegam pelo diário de mudanças do índice
+INTERVALO_VARREDURA = 60
+# Entradas do diário de mudanças guardadas; quem ficou mais atrasado relê o índice inteiro
+LIMITE_DIARIO = 10000
+# Travas de gravação entre processos: arquivos em backups/.travas/, um por faixa de chaves
+DIRETORIO_TRAVAS = ".travas"
+FAIXAS_TRAVAS = 64
+
+_COLUNAS_INDICE = "chave, mtime_ns, " + ", ".join(CAMPOS_INDICE)
+
+
+def load_backups(backup_dir=BACKUP_DIR):
+    backups = {}
+    with etapa("backups.load_backups"):
+        for filename in os.listdir(backup_dir):
+            if filename.endswith(".json"):
+                with open(os.path.join(backup_dir, filename), 'r', encoding='utf-8') as f:
+                    try:
+                        backups[filename[:-5]] = json.load(f)
+                    except Exception as e:
+                        print("Erro ao ler backup JSON:", filename, e)
+    return backups
+
+
+def gravar_json_atomico(caminho, dados):
+    """Grava JSON compacto num temporário e renomeia: quem lê nunca vê um arquivo pela metade."""
+    temporario = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(dados, f, ensure_ascii=False, separators=(',', ':'))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporario, caminho)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+
+
+def save_backup(backup_key, backup_data, backup_dir=BACKUP_DIR):
+    gravar_json_atomico(os.path.join(backup_dir, f"{backup_key}.json"), backup_data)
+
+
+@contextlib.contextmanager
+def trava_arquivo(caminho):
+    """Trava exclusiva sobre o arquivo `caminho`, entre processos e threads, enquanto o bloco roda."""
+    with open(caminho, 'a+b') as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            while True:
+                f.seek(0)
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass  # LK_LOCK desiste depois de 10 s; continua esperando
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class BackupStore:
+    """Índice SQLite dos backups por cliente, invalidado pelo mtime de cada arquivo.
+
+    O corpo completo de um orçamento só é lido do disco em `carregar`. Vários processos
+    (réplicas do app) podem usar o mesmo diretório: o índice fica em modo WAL, cada
+    gravação de backup é feita sob uma trava de arquivo da chave, e toda mudança no
+    índice entra num diário (tabela `mudancas`). `versao` é o número da última entrada
+    do diário já vista por este processo; `mudancas_desde` diz o que mudou depois dela.
+    """
+
+    def __init__(self, backup_dir=BACKUP_DIR, intervalo_varredura=INTERVALO_VARREDURA):
+        self.backup_dir = backup_dir
+        self.intervalo_varredura = intervalo_varredura
+        self._ultima_varredura = None
+        os.makedirs(os.path.join(backup_dir, DIRETORIO_TRAVAS), exist_ok=True)
+        self._lock = threading.Lock()
+        self._travas_da_thread = threading.local()
+        self._conn = sqlite3.connect(os.path.join(backup_dir, INDICE_ARQUIVO), timeout=ESPERA_SQLITE,
+                                     check_same_thread=False)
+        # WAL: quem lê não espera quem grava, e o arquivo aguenta vários processos
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            if self._conn.execute("PRAGMA user_version").fetchone()[0] != VERSAO_INDICE:
+                self._conn.execute("DROP TABLE IF EXISTS backups")
+                self._conn.execute("DROP TABLE IF EXISTS mudancas")
+                self._conn.execute(f"PRAGMA user_version = {VERSAO_INDICE}")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS backups (
+                    chave TEXT PRIMARY KEY,
+                    mtime_ns INTEGER NOT NULL,
+                    cliente_nome TEXT NOT NULL DEFAULT '',
+                    cliente_telefone TEXT NOT NULL DEFAULT '',
+                    cliente_endereco TEXT NOT NULL DEFAULT '',
+                    projetos_nome TEXT NOT NULL DEFAULT ''
+                )
+            """)
+            # Índice por cliente de versões anteriores: a busca é feita pelo IndiceClientes, em memória
+            self._conn.execute("DROP INDEX IF EXISTS idx_backups_cliente")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS mudancas (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    chave TEXT NOT NULL
+                )
+            """)
+        self._ler_versao()
+
+    def _ler_versao(self):
+        # data_version só muda quando outra conexão grava: é o aviso barato de que há novidade
+        self._versao_dados = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        self.versao = self._conn.execute("SELECT COALESCE(MAX(seq), 0) FROM mudancas").fetchone()[0]
+
+    @contextlib.contextmanager
+    def trava(self, backup_key):
+        """Exclusão entre processos para gravar um backup; reentrante na mesma thread."""
+        faixa = zlib.crc32(backup_key.encode('utf-8')) % FAIXAS_TRAVAS
+        travadas = self._travas_da_thread.__dict__.setdefault('faixas', set())
+        if faixa in travadas:
+            yield
+            return
+        travadas.add(faixa)
+        try:
+            with trava_arquivo(os.path.join(self.backup_dir, DIRETORIO_TRAVAS, f"{faixa:02d}.lock")):
+                yield
+        finally:
+            travadas.discard(faixa)
+
+    @staticmethod
+    def _linha_indice(backup_key, mtime_ns, dados):
+        # Arquivos corrompidos ficam indexados sem campos para não serem relidos a cada rerun
+        if not isinstance(dados, dict):
+            dados = {}
+        return (backup_key, mtime_ns) + tuple(str(dados.get(campo) or '') for campo in CAMPOS_INDICE)
+
+    def _gravar_indice(self, alterados, removidos=(), anteriores=None):
+        """Grava as linhas e as registra no diário, na mesma transação.
+
+        Com `anteriores` (chave -> mtime_ns lido antes), só grava se ninguém mudou a linha
+        nesse meio-tempo: uma varredura lenta não desfaz a gravação de outro processo.
+        """
+        with self._conn:
+            if anteriores is None:
+                self._conn.executemany(
+                    f"INSERT OR REPLACE INTO backups ({_COLUNAS_INDICE}) VALUES (?, ?, ?, ?, ?, ?)", alterados)
+                self._conn.executemany("DELETE FROM backups WHERE chave = ?", [(chave,) for chave in removidos])
+                mudaram = [linha[0] for linha in alterados] + list(removidos)
+            else:
+                gravar = (f"INSERT INTO backups ({_COLUNAS_INDICE}) VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (chave) DO UPDATE SET "
+                          + ", ".join(f"{c} = excluded.{c}" for c in ('mtime_ns',) + CAMPOS_INDICE)
+                          + " WHERE backups.mtime_ns IS ?")
+                mudaram = [linha[0] for linha in alterados
+                           if self._conn.execute(gravar, linha + (anteriores.get(linha[0]),)).rowcount]
+                mudaram += [chave for chave in removidos if self._conn.execute(
+                    "DELETE FROM backups WHERE chave = ? AND mtime_ns = ?", (chave, anteriores[chave])).rowcount]
+            self._conn.executemany("INSERT INTO mudancas (chave) VALUES (?)", [(chave,) for chave in mudaram])
+            self._conn.execute("DELETE FROM mudancas WHERE seq <= (SELECT MAX(seq) FROM mudancas) - ?", (LIMITE_DIARIO,))
+        self._ler_versao()
+
+    def _ler_arquivo(self, caminho):
+        try:
+            with open(caminho, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            print("Erro ao ler backup JSON:", os.path.basename(caminho), e)
+            return None
+
+    def sincronizar(self, forcar=False):
+        """Vê pelo diário o que os outros processos gravaram e, de tempos em tempos (ou com
+        `forcar`), varre o diretório atrás de arquivos novos ou alterados por fora do app."""
+        with self._lock, etapa("backups.sincronizar"):
+            if self._conn.execute("PRAGMA data_version").fetchone()[0] != self._versao_dados:
+                self._ler_versao()
+            agora = time.monotonic()
+            if not forcar and self._ultima_varredura is not None and agora - self._ultima_varredura < self.intervalo_varredura:
+                return
+            self._ultima_varredura = agora
+            indexados = dict(self._conn.execute("SELECT chave, mtime_ns FROM backups"))
+            vistos = set()
+            alterados = []
+            with os.scandir(self.backup_dir) as entradas:
+                for entrada in entradas:
+                    if not entrada.name.endswith(".json") or not entrada.is_file():
+                        continue
+                    chave = entrada.name[:-5]
+                    vistos.add(chave)
+                    mtime_ns = entrada.stat().st_mtime_ns
+                    if indexados.get(chave) == mtime_ns:
+                        continue
+                    alterados.append(self._linha_indice(chave, mtime_ns, self._ler_arquivo(entrada.path)))
+            removidos = list(indexados.keys() - vistos)
+            contar("backups.relidos", len(alterados))
+            if alterados or removidos:
+                self._gravar_indice(alterados, removidos, anteriores=indexados)
+
+    def mudancas_desde(self, versao):
+        """(versão atual, registros alterados, chaves removidas) depois de `versao`.
+
+        Os registros têm o formato de `registros`. Devolve None se o diário já não tem
+        as entradas desde `versao`; aí quem chamou refaz a partir de `registros`.
+        """
+        with self._lock:
+            ate = self.versao
+            primeira = self._conn.execute("SELECT MIN(seq) FROM mudancas").fetchone()[0]
+            # Diário já descartado, ou recriado por outro processo com um esquema novo
+            if (primeira is not None and versao < primeira - 1) or versao > ate:
+                return None
+            chaves = {chave for (chave,) in self._conn.execute(
+                "SELECT chave FROM mudancas WHERE seq > ? AND seq <= ?", (versao, ate))}
+            alterados = self._conn.execute(
+                f"SELECT {_COLUNAS_INDICE} FROM backups WHERE chave IN "
+                "(SELECT chave FROM mudancas WHERE seq > ? AND seq <= ?)", (versao, ate)).fetchall()
+        return ate, alterados, chaves - {linha[0] for linha in alterados}
+
+    def fechar(self):
+        with self._lock:
+            self._conn.close()
+
+    def registros(self):
+        """(chave, mtime_ns, cliente_nome, cliente_telefone, cliente_endereco, projetos_nome) de cada backup."""
+        with self._lock:
+            return self._conn.execute(f"SELECT {_COLUNAS_INDICE} FROM backups").fetchall()
+
+    def carregar(self, backup_key):
+        """Lê o corpo completo de um backup (None se o arquivo sumiu ou está corrompido)."""
+        with etapa("backups.carregar"):
+            return self._ler_arquivo(os.path.join(self.backup_dir, f"{backup_key}.json"))
+
+    def salvar(self, backup_key, backup_data):
+        # Sob a trava, o arquivo e a linha do índice ficam sempre com a mesma gravação
+        with self.trava(backup_key):
+            save_backup(backup_key, backup_data, self.backup_dir)
+            mtime_ns = os.stat(os.path.join(self.backup_dir, f"{backup_key}.json")).st_mtime_ns
+            with self._lock:
+                self._gravar_indice([self._linha_indice(backup_key, mtime_ns, backup_data)])
+
+
+class AutoSalvamento:
+    """Grava backups numa thread de fundo, agrupando alterações seguidas do mesmo orçamento.
+
+    `agendar` só guarda a versão mais recente e retorna na hora; cada chave é gravada
+    `atraso` segundos depois da última alteração.
+    """
+
+    def __init__(self, store, atraso=2.0):
+        self.store = store
+        self.atraso = atraso
+        self._pendentes = {}
+        self._cond = threading.Condition()
+        threading.Thread(target=self._executar, name="autosalvamento", daemon=True).start()
+        atexit.register(self.descarregar)
+
+    def agendar(self, backup_key, backup_data):
+        with self._cond:
+            self._pendentes[backup_key] = (backup_data, time.monotonic() + self.atraso)
+            self._cond.notify()
+
+    def _gravar(self, backup_key, backup_data):
+        try:
+            self.store.salvar(backup_key, backup_data)
+        except Exception as e:
+            print("Erro no salvamento automático:", backup_key, e)
+
+    def _executar(self):
+        while True:
+            with self._cond:
+                while True:
+                    agora = time.monotonic()
+                    prontos = [chave for chave, (_, prazo) in self._pendentes.items() if prazo <= agora]
+                    if prontos:
+                        break
+                    proximo = min((prazo for _, prazo in self._pendentes.values()), default=None)
+                    self._cond.wait(None if proximo is None else proximo - agora)
+                lote = [(chave, self._pendentes.pop(chave)[0]) for chave in prontos]
+            for backup_key, backup_data in lote:
+                self._gravar(backup_key, backup_data)
+
+    def descarregar(self):
+        """Grava na hora tudo o que estiver pendente (chamado também na saída do processo)."""
+        with self._cond:
+            lote = [(chave, dados) for chave, (dados, _) in self._pendentes.items()]
+            self._pendentes.clear()
+        for backup_key, backup_data in lote:
+            self._gravar(backup_key, backup_data)
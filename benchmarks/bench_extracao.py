@@ -0,0 +1,85 @@
+"""Compara a extração de campos gerais atual com a versão anterior (dez re.search com IGNORECASE).
+
+Uso: python benchmarks/bench_extracao.py
+"""
+import re
+import timeit
+from io import BytesIO
+
+import sintetico  # ajusta o sys.path para a raiz do repositório
+import pdfplumber
+from extracao_pdf import extrair_campos_gerais
+
+TAMANHOS = [5, 50, 200, 500]
+SEMENTES = [1, 2, 3]
+
+
+def campos_gerais_legado(textos_paginas):
+    """Implementação anterior, mantida aqui só como referência."""
+    texto_completo = ""
+    for texto in textos_paginas:
+        if texto:
+            texto_completo += texto + "\n"
+    texto_lower = texto_completo.lower()
+    dados = {}
+    match = re.search(r'cliente[:\s]+(.+?)(?:\n|telefone)', texto_lower, re.IGNORECASE)
+    if match:
+        dados['cliente_nome'] = match.group(1).strip().title()
+    match = re.search(r'telefone[:\s]+(.+?)(?:\n|endereço)', texto_lower, re.IGNORECASE)
+    if match:
+        dados['cliente_telefone'] = match.group(1).strip()
+    match = re.search(r'endereço[:\s]+(.+?)(?:\n{2,}|item)', texto_lower, re.IGNORECASE | re.DOTALL)
+    if match:
+        dados['cliente_endereco'] = match.group(1).strip().title()
+    match = re.search(r'prazo de entrega[:\s]+(.+?)(?:\n|forma)', texto_lower, re.IGNORECASE)
+    if match:
+        dados['prazo'] = match.group(1).strip().title()
+    match = re.search(r'forma de pagamento[:\s]+(.+?)(?:\n|orçamento)', texto_lower, re.IGNORECASE)
+    if match:
+        dados['pagamento'] = match.group(1).strip().title()
+    match = re.search(r'orçamento válido por[:\s]+(.+?)(?:\n|observações)', texto_lower, re.IGNORECASE)
+    if match:
+        dados['orcamento_valido_por'] = match.group(1).strip().title()
+    match = re.search(r'observações[:\s]+(.+?)(?:\n{2,}|itens inclusos)', texto_lower, re.IGNORECASE | re.DOTALL)
+    if match:
+        dados['observacao'] = match.group(1).strip().capitalize()
+    match = re.search(r'itens inclusos[:\s]+(.+?)(?:\n{2,}|itens não inclusos)', texto_lower, re.IGNORECASE | re.DOTALL)
+    if match:
+        dados['itens_inclusos'] = match.group(1).strip().capitalize()
+    match = re.search(r'itens não inclusos[:\s]+(.+?)(?:\n{2,}|móveis conforme|$)', texto_lower, re.IGNORECASE | re.DOTALL)
+    if match:
+        dados['itens_nao_inclusos'] = match.group(1).strip().capitalize()
+    match = re.search(r'projetos[:\s]+(.+)$', texto_lower, re.IGNORECASE)
+    if match:
+        dados['projetos_nome'] = match.group(1).strip().title()
+    return dados
+
+
+def campos_gerais_atual(textos_paginas):
+    return extrair_campos_gerais("".join(texto + "\n" for texto in textos_paginas if texto))
+
+
+def textos_do_pdf(pdf_bytes):
+    with pdfplumber.open(BytesIO(pdf_bytes)) as pdf:
+        return [page.extract_text() for page in pdf.pages]
+
+
+def main():
+    print(f"{'itens':>6} {'chars':>8} {'anterior (µs)':>14} {'atual (µs)':>11} {'ganho':>7}")
+    for n_itens in TAMANHOS:
+        corpus = [textos_do_pdf(sintetico.gerar_pdf(sintetico.gerar_orcamento(n_itens, s))) for s in SEMENTES]
+        for textos in corpus:
+            legado, atual = campos_gerais_legado(textos), campos_gerais_atual(textos)
+            if legado != atual:
+                raise SystemExit(f"Saída diferente com {n_itens} itens:\n{legado}\n{atual}")
+        repeticoes = max(20, 2000 // n_itens)
+        t_legado = min(timeit.repeat(lambda: [campos_gerais_legado(t) for t in corpus], number=repeticoes, repeat=3))
+        t_atual = min(timeit.repeat(lambda: [campos_gerais_atual(t) for t in corpus], number=repeticoes, repeat=3))
+        por_pdf = repeticoes * len(corpus) / 1e6
+        chars = sum(len(t) for t in corpus[0] if t)
+        print(f"{n_itens:>6} {chars:>8} {t_legado / por_pdf:>14.0f} {t_atual / por_pdf:>11.0f} {t_legado / t_atual:>6.1f}x")
+    print("Saída idêntica em todo o corpus.")
+
+
+if __name__ == "__main__":
+    main()
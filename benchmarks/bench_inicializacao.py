@@ -0,0 +1,78 @@
+"""Tempo de importação que o app soma ao Streamlit na abertura (python -X importtime).
+
+Compara os imports do topo do app antes da carga preguiçosa (pandas, reportlab e
+pdfplumber importados logo de início) com os imports atuais. O Streamlit é importado
+antes nos dois casos, como acontece com `streamlit run`.
+
+Uso: python benchmarks/bench_inicializacao.py [--salvar]
+"""
+import os
+import sys
+import statistics
+import subprocess
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTADO = os.path.join(RAIZ, "benchmarks", "resultados", "inicializacao.txt")
+RODADAS = 7
+
+ANTES = ("import pandas, os, json, re; "
+         "from reportlab.lib.pagesizes import letter; "
+         "from reportlab.lib.styles import getSampleStyleSheet; "
+         "from reportlab.lib.units import inch; "
+         "from reportlab.platypus import SimpleDocTemplate, Paragraph, Table, TableStyle, Spacer, Image; "
+         "from io import BytesIO; from datetime import datetime; import pdfplumber")
+# Os mesmos imports do topo de orcamento_app.py (manter em sincronia)
+DEPOIS = ("import os, uuid, tempfile, functools; from datetime import datetime; "
+          "from extracao_pdf import pdfplumber_disponivel, CacheExtracao, DIRETORIO_CACHE_EXTRACAO, DIAGNOSTICO_PADRAO; "
+          "from backup_store import BACKUP_DIR, BackupStore, AutoSalvamento; "
+          "from historico import HistoricoOrcamentos; "
+          "from imagens import CacheImagens, guardar_foto, caminho_foto; "
+          "from busca_clientes import IndiceClientes; "
+          "from catalogo import ArquivoCatalogo, interpretar_itens, CATALOGO_PADRAO; "
+          "from modelo_orcamento import ItemOrcamento, Orcamento; "
+          "from lote import importar_pdfs_em_lote, JA_IMPORTADO; "
+          "import instrumentacao; from instrumentacao import etapa, MEDICAO_PADRAO, ARQUIVO_MEDICOES; "
+          "from pdf_orcamento import CachePDF, formatar_moeda, nome_arquivo_pdf, EMPRESA_NOME_PADRAO, EMPRESA_ENDERECO_PADRAO; "
+          "pdfplumber_disponivel()")
+
+
+def medir(imports):
+    """Mediana (ms) do tempo acumulado dos módulos importados depois do Streamlit."""
+    tempos = []
+    for _ in range(RODADAS):
+        saida = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import streamlit; {imports}"],
+                               cwd=RAIZ, capture_output=True, text=True, check=True).stderr
+        total = 0
+        depois_do_streamlit = False
+        for linha in saida.splitlines():
+            partes = linha.split("|")
+            if len(partes) != 3 or not partes[1].strip().isdigit():
+                continue
+            nome = partes[2]
+            # Só as linhas de primeiro nível: o acumulado já inclui as dependências
+            if nome.startswith(" ") and not nome.startswith("  "):
+                if depois_do_streamlit:
+                    total += int(partes[1])
+                if nome.strip() == "streamlit":
+                    depois_do_streamlit = True
+        tempos.append(total / 1000)
+    return statistics.median(tempos)
+
+
+def main():
+    antes, depois = medir(ANTES), medir(DEPOIS)
+    linhas = [
+        f"Python {sys.version.split()[0]}, mediana de {RODADAS} rodadas, importação além do Streamlit",
+        f"antes (pandas/reportlab/pdfplumber no topo): {antes:8.1f} ms",
+        f"depois (carga preguiçosa):                   {depois:8.1f} ms",
+        f"redução:                                     {antes - depois:8.1f} ms",
+    ]
+    print("\n".join(linhas))
+    if "--salvar" in sys.argv:
+        os.makedirs(os.path.dirname(RESULTADO), exist_ok=True)
+        with open(RESULTADO, "w", encoding="utf-8") as f:
+            f.write("\n".join(linhas) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Memória e tempo da geração do PDF com 10, 100 e 1000 itens.
+
+Compara a tabela de itens numa única `Table` (como era antes) com a tabela montada
+uma página por vez, e o PDF num `BytesIO` com o arquivo temporário (`gerar_pdf_temporario`).
+O pico de memória é medido com tracemalloc (só alocações do Python).
+
+Uso: python benchmarks/bench_memoria_pdf.py [--salvar]
+"""
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import sintetico  # ajusta o sys.path para a raiz do repositório
+import pdf_orcamento
+from pdf_orcamento import ModeloOrcamentoPDF, localizar_logo
+
+TAMANHOS = [10, 100, 1000]
+RESULTADO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "resultados", "memoria_pdf.txt")
+
+
+@contextmanager
+def tabela_unica():
+    """Troca a tabela paginada por uma única `Table` com todos os itens."""
+    original = pdf_orcamento._tabela_paginada
+    pdf_orcamento._tabela_paginada = lambda modelo, itens: modelo.tabela_itens(itens)
+    try:
+        yield
+    finally:
+        pdf_orcamento._tabela_paginada = original
+
+
+def gerar_bytes(modelo, dados):
+    return len(modelo.gerar_pdf(dados))
+
+
+def gerar_temporario(modelo, dados):
+    with modelo.gerar_pdf_temporario(dados) as arquivo:
+        return arquivo.seek(0, os.SEEK_END)
+
+
+def medir(funcao, modelo, dados):
+    inicio = time.perf_counter()
+    funcao(modelo, dados)
+    segundos = time.perf_counter() - inicio
+    tracemalloc.start()
+    tamanho = funcao(modelo, dados)
+    pico = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return segundos, pico, tamanho
+
+
+def main():
+    modelo = ModeloOrcamentoPDF(localizar_logo())
+    modelo.gerar_pdf(sintetico.gerar_orcamento(5))
+    linhas = [f"{'itens':>6} {'modo':<28} {'tempo':>8} {'pico':>9} {'PDF':>8}"]
+    for n in TAMANHOS:
+        dados = sintetico.gerar_orcamento(n, semente=n)
+        casos = [("tabela única + BytesIO", gerar_bytes, True),
+                 ("paginada + BytesIO", gerar_bytes, False),
+                 ("paginada + temporário", gerar_temporario, False)]
+        for nome, funcao, unica in casos:
+            if unica:
+                with tabela_unica():
+                    segundos, pico, tamanho = medir(funcao, modelo, dados)
+            else:
+                segundos, pico, tamanho = medir(funcao, modelo, dados)
+            linhas.append(f"{n:>6} {nome:<28} {segundos:>7.2f}s {pico / 2**20:>7.1f}MB {tamanho / 1024:>6.0f}KB")
+            print(linhas[-1], flush=True)
+    if "--salvar" in sys.argv:
+        with open(RESULTADO, 'w', encoding='utf-8') as f:
+            f.write("\n".join(linhas) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""Teste de estresse do armazenamento com vários processos gravando no mesmo diretório.
+
+Simula réplicas do app: N processos gravam backups (metade das vezes pelo histórico
+de versões) num conjunto pequeno de chaves, para haver disputa pela mesma chave, e
+um processo leitor acompanha só pelo diário de mudanças, sem varrer o diretório.
+No fim confere que:
+
+- todo backup é um JSON íntegro e não sobrou arquivo temporário;
+- o índice tem cada backup com o mtime e o cliente do arquivo gravado por último;
+- cada histórico tem as versões 1..n, sem repetição, e todas se reconstroem;
+- o leitor chegou exatamente ao índice final só pelas notificações do diário;
+- o diário tem uma entrada por gravação.
+
+Uso: python benchmarks/estresse_armazenamento.py [--processos 8] [--gravacoes 150] [--chaves 12]
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import multiprocessing
+
+import sintetico  # ajusta o sys.path para a raiz do repositório
+from backup_store import BackupStore
+from busca_clientes import IndiceClientes
+from historico import HistoricoOrcamentos, DIRETORIO_HISTORICO
+
+
+def escritor(diretorio, numero, gravacoes, chaves, inicio, feitos):
+    store = BackupStore(diretorio)
+    historico = HistoricoOrcamentos(store, diretorio)
+    rnd = random.Random(numero)
+    inicio.wait()
+    for n in range(gravacoes):
+        chave = f"orcamento_{rnd.randrange(chaves):03d}"
+        dados = {**sintetico.gerar_orcamento(rnd.randint(1, 6), semente=numero * 100000 + n),
+                 'cliente_nome': f"Cliente {numero}-{n}", 'escritor': numero}
+        if n % 2:
+            historico.salvar_versao(chave, dados)
+        else:
+            store.salvar(chave, dados)
+    feitos.put(gravacoes)
+
+
+def leitor(diretorio, pronto, fim, resultado):
+    # Depois da primeira varredura (com o diretório ainda vazio), tudo o que sabe vem do diário
+    store = BackupStore(diretorio, intervalo_varredura=float('inf'))
+    store.sincronizar()
+    indice = IndiceClientes()
+    pronto.set()
+    atualizacoes = 0
+    while True:
+        terminou = fim.is_set()
+        versao = store.versao
+        store.sincronizar()
+        if store.versao != versao:
+            atualizacoes += 1
+        indice.sincronizar(store)
+        if terminou:
+            break
+        time.sleep(0.01)
+    resultado.put((dict(indice.campos), atualizacoes))
+
+
+def conferir(diretorio, total_gravacoes, campos_leitor):
+    erros = []
+    temporarios = [nome for nome in os.listdir(diretorio) if nome.endswith(".tmp")]
+    if temporarios:
+        erros.append(f"arquivos temporários esquecidos: {temporarios[:5]}")
+    arquivos = {}
+    for nome in os.listdir(diretorio):
+        if nome.endswith(".json"):
+            caminho = os.path.join(diretorio, nome)
+            try:
+                with open(caminho, 'r', encoding='utf-8') as f:
+                    arquivos[nome[:-5]] = (json.load(f), os.stat(caminho).st_mtime_ns)
+            except ValueError as e:
+                erros.append(f"{nome}: JSON inválido ({e})")
+
+    store = BackupStore(diretorio, intervalo_varredura=float('inf'))
+    registros = {chave: (mtime_ns, cliente) for chave, mtime_ns, cliente, *_ in store.registros()}
+    for chave, (dados, mtime_ns) in arquivos.items():
+        if registros.get(chave) != (mtime_ns, dados['cliente_nome']):
+            erros.append(f"índice de {chave}: {registros.get(chave)} != arquivo {(mtime_ns, dados['cliente_nome'])}")
+    if registros.keys() != arquivos.keys():
+        erros.append(f"índice com chaves diferentes dos arquivos: {sorted(registros.keys() ^ arquivos.keys())}")
+
+    historico = HistoricoOrcamentos(store, diretorio)
+    for nome in os.listdir(os.path.join(diretorio, DIRETORIO_HISTORICO)):
+        chave = nome[:-len(".jsonl")]
+        numeros = [versao for versao, _ in historico.versoes(chave)]
+        if numeros != list(range(1, len(numeros) + 1)):
+            erros.append(f"histórico de {chave}: versões {numeros}")
+            continue
+        for versao in numeros:
+            try:
+                historico.carregar_versao(chave, versao)
+            except Exception as e:
+                erros.append(f"histórico de {chave}, versão {versao}: {e!r}")
+
+    if {chave: campos[0] for chave, campos in campos_leitor.items()} != {c: r[1] for c, r in registros.items()}:
+        erros.append("o leitor terminou com clientes diferentes do índice final")
+    if store.versao != total_gravacoes:
+        erros.append(f"diário com {store.versao} entradas para {total_gravacoes} gravações")
+    return erros
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Estresse do armazenamento com vários processos")
+    parser.add_argument("--processos", type=int, default=8, help="processos escritores (padrão: %(default)s)")
+    parser.add_argument("--gravacoes", type=int, default=150, help="gravações por processo (padrão: %(default)s)")
+    parser.add_argument("--chaves", type=int, default=12, help="chaves disputadas (padrão: %(default)s)")
+    args = parser.parse_args(argv)
+
+    diretorio = tempfile.mkdtemp(prefix="estresse_backups_")
+    contexto = multiprocessing.get_context("spawn")
+    try:
+        BackupStore(diretorio)  # cria o índice antes de os processos disputarem o arquivo
+        inicio, pronto, fim = contexto.Event(), contexto.Event(), contexto.Event()
+        feitos, resultado = contexto.Queue(), contexto.Queue()
+        processo_leitor = contexto.Process(target=leitor, args=(diretorio, pronto, fim, resultado))
+        processo_leitor.start()
+        escritores = [contexto.Process(target=escritor, args=(diretorio, n, args.gravacoes, args.chaves, inicio, feitos))
+                      for n in range(args.processos)]
+        for processo in escritores:
+            processo.start()
+        pronto.wait(60)
+        time.sleep(1)  # espera os escritores abrirem o índice
+        comeco = time.perf_counter()
+        inicio.set()
+        total = sum(feitos.get(timeout=600) for _ in escritores)
+        segundos = time.perf_counter() - comeco
+        for processo in escritores:
+            processo.join()
+        fim.set()
+        campos_leitor, atualizacoes = resultado.get(timeout=60)
+        processo_leitor.join()
+
+        print(f"{args.processos} processos, {total} gravações em {args.chaves} chaves: "
+              f"{segundos:.2f}s ({total / segundos:.0f} gravações/s)")
+        print(f"leitor: {atualizacoes} avisos de mudança pelo diário")
+        erros = conferir(diretorio, total, campos_leitor)
+    finally:
+        shutil.rmtree(diretorio, ignore_errors=True)
+    for erro in erros:
+        print("FALHA", erro)
+    if not erros:
+        print("OK: arquivos, índice, históricos e diário consistentes")
+    return 1 if erros else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
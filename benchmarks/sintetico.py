@@ -0,0 +1,70 @@
+"""Orçamentos sintéticos no layout do próprio app, para os benchmarks."""
+import os
+import sys
+import random
+from datetime import datetime, timedelta
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+
+from backup_store import save_backup
+from pdf_orcamento import ModeloOrcamentoPDF, localizar_logo, EMPRESA_NOME_PADRAO, EMPRESA_ENDERECO_PADRAO
+
+CLIENTES = ["João Silva", "Maria Conceição", "José Antônio Pereira", "Ana Lúcia Schmitt", "Luís Gonçalves"]
+MOVEIS = ["Armário Aéreo", "Balcão de Pia", "Roupeiro", "Painel de TV", "Gaveteiro", "Nicho", "Cristaleira", "Bancada"]
+MATERIAIS = ["MDF Branco", "MDF Freijó", "MDP Carvalho", "Laca Fosca", "Compensado Naval"]
+DETALHES = ["Portas de correr", "Puxadores em alumínio", "Dobradiças com amortecedor", "Fundo em MDF 6mm",
+            "Corrediças telescópicas", "Iluminação em LED", "Acabamento em fita de borda 1mm"]
+
+
+def gerar_orcamento(n_itens, semente=0):
+    """Dicionário de orçamento no formato usado pelo app e pelos backups."""
+    rnd = random.Random(semente)
+    itens = []
+    for i in range(n_itens):
+        qtd = rnd.randint(1, 4)
+        preco_unit = round(rnd.uniform(150, 4500), 2)
+        itens.append({
+            'Item': f"{rnd.choice(MOVEIS)} {i + 1}",
+            'Qtd': qtd,
+            'Especificações': "\n".join(rnd.sample(DETALHES, rnd.randint(1, 4))),
+            'Material': rnd.choice(MATERIAIS),
+            'Preço Unit': preco_unit,
+            'Subtotal': round(qtd * preco_unit, 2),
+        })
+    return {
+        'empresa_nome': EMPRESA_NOME_PADRAO,
+        'empresa_endereco': EMPRESA_ENDERECO_PADRAO,
+        'cliente_nome': rnd.choice(CLIENTES),
+        'cliente_telefone': f"(47) 9{rnd.randint(1000, 9999)}-{rnd.randint(1000, 9999)}",
+        'cliente_endereco': f"Rua {rnd.choice(['XV de Novembro', 'Itajaí', 'Amazonas'])}, {rnd.randint(1, 2000)}",
+        'projetos_nome': f"Projeto {rnd.choice(['Cozinha', 'Dormitório', 'Sala'])}",
+        'itens': itens,
+        'desconto': rnd.choice([0, 0, 5, 10]),
+        'prazo': f"{rnd.choice([30, 45, 60])} dias úteis",
+        'pagamento': rnd.choice(["50% de entrada e 50% na entrega", "Pix à vista", "10x no cartão"]),
+        'orcamento_valido_por': f"{rnd.choice([10, 15, 30])} dias",
+        'observacao': "Medidas sujeitas a conferência no local.",
+        'itens_inclusos': "Montagem e instalação.",
+        'itens_nao_inclusos': "Eletrodomésticos e pedras.",
+    }
+
+
+_modelo = None
+
+
+def gerar_pdf(dados):
+    global _modelo
+    if _modelo is None:
+        _modelo = ModeloOrcamentoPDF(localizar_logo())
+    return _modelo.gerar_pdf(dados)
+
+
+def gravar_backups(diretorio, quantidade, itens_por_backup=8):
+    """Grava `quantidade` backups JSON sintéticos em `diretorio`, com datas espalhadas por dois anos."""
+    os.makedirs(diretorio, exist_ok=True)
+    inicio = datetime(2024, 1, 1)
+    for i in range(quantidade):
+        salvo_em = (inicio + timedelta(minutes=i * 730 * 24 * 60 // max(quantidade, 1))).isoformat(timespec='seconds')
+        save_backup(f"orcamento_{i:05d}", {**gerar_orcamento(itens_por_backup, semente=i), 'salvo_em': salvo_em}, diretorio)
@@ -0,0 +1,269 @@
+"""Suíte de desempenho e regressão: extração, geração de PDF e leitura dos backups.
+
+Mede tempo (mediana de algumas rodadas) e pico de memória (tracemalloc) de
+`extrair_dados_pdf`, `ModeloOrcamentoPDF.gerar_pdf`, `load_backups`,
+`BackupStore.sincronizar`, do histórico de versões e da página de análise com orçamentos sintéticos
+no layout do app, e confere que o PDF gerado volta pela extração com os mesmos itens e o mesmo total
+e que o histórico se recupera de uma gravação interrompida.
+
+Sem argumentos, compara com a linha de base gravada e termina com código 1 se
+algum caso ficar mais lento/pesado que a tolerância ou se a ida e volta falhar.
+
+Uso: python benchmarks/suite.py [--salvar] [--tolerancia 0.3] [--rodadas 3]
+                                [--so extracao,geracao,backups,historico,analise]
+"""
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import statistics
+import tracemalloc
+
+import sintetico  # ajusta o sys.path para a raiz do repositório
+import analise
+from backup_store import load_backups, BackupStore, INDICE_ARQUIVO
+from extracao_pdf import extrair_dados_pdf
+from historico import HistoricoOrcamentos
+
+LINHA_DE_BASE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "resultados", "linha_de_base.json")
+
+TAMANHOS_EXTRACAO = [10, 100, 500]
+TAMANHOS_GERACAO = [10, 100, 1000]
+QUANTIDADES_BACKUPS = [1000, 5000]
+QUANTIDADE_ANALISE = 20000
+VERSOES_HISTORICO = 30
+# Folga absoluta somada à tolerância, para casos de poucos milissegundos não acusarem ruído
+FOLGA_TEMPO_S = 0.02
+FOLGA_PICO_MB = 0.5
+
+
+def medir(funcao, rodadas):
+    """(mediana dos tempos em segundos, pico de memória em MB, resultado da última chamada)."""
+    tempos = []
+    for _ in range(rodadas):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append(time.perf_counter() - inicio)
+    tracemalloc.start()
+    funcao()
+    pico = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return statistics.median(tempos), pico / 2**20, resultado
+
+
+def apagar_sqlite(caminho):
+    # Em modo WAL, a base são três arquivos
+    for sufixo in ("", "-wal", "-shm"):
+        if os.path.exists(caminho + sufixo):
+            os.remove(caminho + sufixo)
+
+
+def _texto(valor):
+    return " ".join(str(valor).split())
+
+
+def conferir_ida_e_volta(dados, extraido):
+    """Diferenças entre o orçamento original e o que a extração leu do PDF dele."""
+    erros = []
+    originais, lidos = dados['itens'], extraido['itens']
+    if len(originais) != len(lidos):
+        erros.append(f"{len(originais)} itens gerados, {len(lidos)} extraídos")
+    for n, (original, lido) in enumerate(zip(originais, lidos), 1):
+        esperado = (_texto(original['Item']), original['Qtd'], _texto(original['Especificações']),
+                    original['Material'][:15], round(original['Subtotal'], 2))
+        obtido = (_texto(lido['Item']), lido['Qtd'], _texto(lido['Especificações']),
+                  lido['Material'], lido['Subtotal'])
+        if esperado != obtido:
+            erros.append(f"item {n}: esperado {esperado}, extraído {obtido}")
+    total_original = round(sum(i['Subtotal'] for i in originais), 2)
+    total_lido = round(sum(i['Subtotal'] for i in lidos), 2)
+    if total_original != total_lido:
+        erros.append(f"total: esperado {total_original}, extraído {total_lido}")
+    for campo in ('cliente_nome', 'cliente_telefone', 'prazo', 'pagamento'):
+        if extraido.get(campo, '').lower() != dados[campo].lower():
+            erros.append(f"{campo}: esperado {dados[campo]!r}, extraído {extraido.get(campo)!r}")
+    return erros
+
+
+def casos_extracao(rodadas):
+    for n in TAMANHOS_EXTRACAO:
+        dados = sintetico.gerar_orcamento(n, semente=n)
+        pdf_bytes = sintetico.gerar_pdf(dados)
+        segundos, pico, extraido = medir(lambda: extrair_dados_pdf(io.BytesIO(pdf_bytes)), rodadas)
+        yield f"extracao_{n}_itens", segundos, pico, conferir_ida_e_volta(dados, extraido)
+
+
+def casos_geracao(rodadas):
+    sintetico.gerar_pdf(sintetico.gerar_orcamento(5))
+    for n in TAMANHOS_GERACAO:
+        dados = sintetico.gerar_orcamento(n, semente=n)
+        segundos, pico, _ = medir(lambda: sintetico.gerar_pdf(dados), rodadas)
+        yield f"geracao_{n}_itens", segundos, pico, []
+
+
+def casos_backups(rodadas):
+    for quantidade in QUANTIDADES_BACKUPS:
+        diretorio = tempfile.mkdtemp(prefix="bench_backups_")
+        try:
+            sintetico.gravar_backups(diretorio, quantidade)
+            segundos, pico, backups = medir(lambda: load_backups(diretorio), rodadas)
+            erros = [] if len(backups) == quantidade else [f"{len(backups)} de {quantidade} backups lidos"]
+            yield f"load_backups_{quantidade}", segundos, pico, erros
+
+            def indexar_do_zero():
+                apagar_sqlite(os.path.join(diretorio, INDICE_ARQUIVO))
+                store = BackupStore(diretorio)
+                store.sincronizar()
+                store.fechar()
+            segundos, pico, _ = medir(indexar_do_zero, rodadas)
+            yield f"indice_completo_{quantidade}", segundos, pico, []
+
+            store = BackupStore(diretorio)
+            store.sincronizar()
+            segundos, pico, _ = medir(lambda: store.sincronizar(forcar=True), rodadas)
+            yield f"indice_sem_mudancas_{quantidade}", segundos, pico, []
+            # Entre as varreduras, só a consulta ao diário de mudanças
+            segundos, pico, _ = medir(store.sincronizar, rodadas)
+            yield f"diario_sem_mudancas_{quantidade}", segundos, pico, []
+            store.fechar()
+        finally:
+            shutil.rmtree(diretorio, ignore_errors=True)
+
+
+def casos_historico(rodadas):
+    dados = sintetico.gerar_orcamento(VERSOES_HISTORICO + 10, semente=VERSOES_HISTORICO)
+    revisoes = [{**dados, 'itens': dados['itens'][:10 + n]} for n in range(VERSOES_HISTORICO)]
+    diretorio = tempfile.mkdtemp(prefix="bench_historico_")
+
+    def revisar_com_queda():
+        # Uma queda no meio do acréscimo da versão 3 deixa a linha pela metade; a revisão é salva de novo
+        pasta = tempfile.mkdtemp(dir=diretorio)
+        store = BackupStore(pasta)
+        historico = HistoricoOrcamentos(store, pasta)
+        for n, revisao in enumerate(revisoes):
+            historico.salvar_versao("orcamento", revisao)
+            if n == 2:
+                caminho = historico._caminho("orcamento")
+                with open(caminho, 'rb+') as f:
+                    f.truncate(os.path.getsize(caminho) - 20)
+                historico.salvar_versao("orcamento", revisao)
+        versoes = [versao for versao, _ in historico.versoes("orcamento")]
+        reconstruidas = [historico.carregar_versao("orcamento", versao) for versao in versoes]
+        store.fechar()
+        return versoes, reconstruidas
+    try:
+        segundos, pico, (versoes, reconstruidas) = medir(revisar_com_queda, rodadas)
+        erros = []
+        if versoes != list(range(1, VERSOES_HISTORICO + 1)):
+            erros.append(f"versões depois da queda: {versoes}")
+        elif reconstruidas != revisoes:
+            erros.append("versões reconstruídas diferentes das revisões salvas")
+        yield f"historico_{VERSOES_HISTORICO}_versoes", segundos, pico, erros
+    finally:
+        shutil.rmtree(diretorio, ignore_errors=True)
+
+
+def casos_analise(rodadas):
+    diretorio = tempfile.mkdtemp(prefix="bench_analise_")
+    try:
+        sintetico.gravar_backups(diretorio, QUANTIDADE_ANALISE)
+
+        def compactar_do_zero():
+            apagar_sqlite(os.path.join(diretorio, analise.ARQUIVO_ANALISE))
+            base = analise.BaseAnalise(diretorio)
+            base.sincronizar()
+            base.fechar()
+        segundos, pico, _ = medir(compactar_do_zero, rodadas)
+        yield f"analise_base_completa_{QUANTIDADE_ANALISE}", segundos, pico, []
+
+        def abrir_pagina():
+            # O que a página faz numa visita com a base já montada, sem DataFrames em memória
+            base = analise.BaseAnalise(diretorio)
+            base.sincronizar()
+            orcamentos, itens = base.tabelas()
+            base.fechar()
+            return orcamentos, itens, (analise.resumo(orcamentos), analise.por_mes(orcamentos),
+                                       analise.por_cliente(orcamentos), analise.por_material(itens))
+        segundos, pico, (orcamentos, itens, _) = medir(abrir_pagina, rodadas)
+        erros = [] if len(orcamentos) == QUANTIDADE_ANALISE else [f"{len(orcamentos)} de {QUANTIDADE_ANALISE} orçamentos"]
+        yield f"analise_pagina_{QUANTIDADE_ANALISE}", segundos, pico, erros
+
+        # Página já aberta e um orçamento salvo de novo: só a diferença entra nos DataFrames
+        base = analise.BaseAnalise(diretorio)
+        base.tabelas()
+        alterado = os.path.join(diretorio, "orcamento_00000.json")
+
+        def atualizar_um():
+            os.utime(alterado, ns=(time.time_ns(), time.time_ns()))
+            base.sincronizar()
+            return base.tabelas()
+        segundos, pico, _ = medir(atualizar_um, rodadas)
+        yield f"analise_um_alterado_{QUANTIDADE_ANALISE}", segundos, pico, []
+
+        def agregar():
+            periodo = analise.filtrar_periodo(orcamentos, itens, "2024-06-01", "2025-05-31")
+            return (analise.resumo(periodo[0]), analise.por_mes(periodo[0]),
+                    analise.por_cliente(periodo[0]), analise.por_material(periodo[1]))
+        segundos, pico, _ = medir(agregar, rodadas)
+        yield f"analise_agregacoes_{QUANTIDADE_ANALISE}", segundos, pico, []
+    finally:
+        shutil.rmtree(diretorio, ignore_errors=True)
+
+
+GRUPOS = {'extracao': casos_extracao, 'geracao': casos_geracao, 'backups': casos_backups,
+          'historico': casos_historico, 'analise': casos_analise}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Suíte de desempenho e regressão")
+    parser.add_argument("--salvar", action="store_true", help="grava os resultados como nova linha de base")
+    parser.add_argument("--tolerancia", type=float, default=0.3,
+                        help="piora relativa aceita em tempo e memória (padrão: %(default)s)")
+    parser.add_argument("--rodadas", type=int, default=3, help="rodadas cronometradas por caso")
+    parser.add_argument("--so", default=",".join(GRUPOS), help="grupos a rodar (padrão: %(default)s)")
+    args = parser.parse_args(argv)
+
+    base = {}
+    if os.path.exists(LINHA_DE_BASE):
+        with open(LINHA_DE_BASE, 'r', encoding='utf-8') as f:
+            base = json.load(f)['casos']
+
+    resultados = {}
+    problemas = []
+    print(f"{'caso':<28} {'tempo':>9} {'base':>9} {'pico':>9} {'base':>9}")
+    for grupo in args.so.split(","):
+        for caso, segundos, pico, erros in GRUPOS[grupo](args.rodadas):
+            resultados[caso] = {'tempo_s': round(segundos, 4), 'pico_mb': round(pico, 2)}
+            anterior = base.get(caso)
+            marca = ""
+            if anterior:
+                if segundos > anterior['tempo_s'] * (1 + args.tolerancia) + FOLGA_TEMPO_S:
+                    problemas.append(f"{caso}: tempo {segundos:.3f}s (linha de base {anterior['tempo_s']:.3f}s)")
+                    marca = "  << mais lento"
+                if pico > anterior['pico_mb'] * (1 + args.tolerancia) + FOLGA_PICO_MB:
+                    problemas.append(f"{caso}: pico {pico:.1f}MB (linha de base {anterior['pico_mb']:.1f}MB)")
+                    marca += "  << mais memória"
+            base_tempo = f"{anterior['tempo_s']:8.3f}s" if anterior else f"{'—':>9}"
+            base_pico = f"{anterior['pico_mb']:7.1f}MB" if anterior else f"{'—':>9}"
+            print(f"{caso:<28} {segundos:8.3f}s {base_tempo} {pico:7.1f}MB {base_pico}{marca}", flush=True)
+            problemas.extend(f"{caso}: {erro}" for erro in erros)
+
+    if args.salvar:
+        os.makedirs(os.path.dirname(LINHA_DE_BASE), exist_ok=True)
+        with open(LINHA_DE_BASE, 'w', encoding='utf-8') as f:
+            json.dump({'python': platform.python_version(), 'plataforma': platform.platform(),
+                       'rodadas': args.rodadas, 'casos': {**base, **resultados}}, f, ensure_ascii=False, indent=2)
+        print(f"Linha de base gravada em {LINHA_DE_BASE}")
+
+    for problema in problemas:
+        print("FALHA", problema)
+    return 1 if problemas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
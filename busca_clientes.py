@@ -0,0 +1,157 @@
+"""Busca aproximada de backups por cliente, telefone, endereço e projeto.
+
+O índice fica em memória e é atualizado só com os backups que mudaram desde a
+última consulta. Cada palavra normalizada (sem acento, minúscula) aponta para os
+backups que a contêm; a busca aceita prefixos ("jo" acha "João") e erros de
+digitação, comparando trigramas ("joao silvs" acha "João Silva").
+"""
+import re
+import bisect
+import threading
+import unicodedata
+
+from instrumentacao import etapa
+
+# Semelhança mínima (coeficiente de Dice sobre trigramas) para aceitar uma palavra parecida
+SIMILARIDADE_MINIMA = 0.5
+
+
+def normalizar(texto):
+    sem_acento = unicodedata.normalize('NFKD', texto or '').encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'[^a-z0-9]+', ' ', sem_acento.lower()).strip()
+
+
+def _palavras(campos):
+    palavras = set()
+    for campo in campos:
+        palavras.update(normalizar(campo).split())
+        # Telefone também entra só com os dígitos, para achar "47999991234" ou "99999"
+        digitos = re.sub(r'\D', '', campo or '')
+        if len(digitos) >= 4:
+            palavras.add(digitos)
+    return palavras
+
+
+def _trigramas(palavra):
+    estendida = f"  {palavra} "
+    return {estendida[i:i + 3] for i in range(len(estendida) - 2)}
+
+
+class IndiceClientes:
+    """Índice invertido em memória sobre os campos de cliente dos backups."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versao_store = None
+        self._mtimes = {}
+        self.campos = {}              # chave -> (cliente, telefone, endereço, projeto)
+        self._palavras_chave = {}     # chave -> palavras
+        self._chaves_palavra = {}     # palavra -> chaves
+        self._palavras_ordenadas = []  # para busca por prefixo com bisect
+        self._palavras_trigrama = {}  # trigrama -> palavras
+
+    def _adicionar_palavra(self, palavra, chave):
+        chaves = self._chaves_palavra.get(palavra)
+        if chaves is None:
+            chaves = self._chaves_palavra[palavra] = set()
+            bisect.insort(self._palavras_ordenadas, palavra)
+            for trigrama in _trigramas(palavra):
+                self._palavras_trigrama.setdefault(trigrama, set()).add(palavra)
+        chaves.add(chave)
+
+    def _remover_palavra(self, palavra, chave):
+        chaves = self._chaves_palavra[palavra]
+        chaves.discard(chave)
+        if not chaves:
+            del self._chaves_palavra[palavra]
+            del self._palavras_ordenadas[bisect.bisect_left(self._palavras_ordenadas, palavra)]
+            for trigrama in _trigramas(palavra):
+                palavras = self._palavras_trigrama[trigrama]
+                palavras.discard(palavra)
+                if not palavras:
+                    del self._palavras_trigrama[trigrama]
+
+    def atualizar(self, chave, campos):
+        self.remover(chave)
+        self.campos[chave] = tuple(campos)
+        # A chave também é indexada: um rascunho salvo antes de o cliente ter nome é
+        # achado pela chave mostrada no aviso de salvamento ("20261017", "ab12cd")
+        palavras = _palavras((chave, *campos))
+        self._palavras_chave[chave] = palavras
+        for palavra in palavras:
+            self._adicionar_palavra(palavra, chave)
+
+    def remover(self, chave):
+        for palavra in self._palavras_chave.pop(chave, ()):
+            self._remover_palavra(palavra, chave)
+        self.campos.pop(chave, None)
+        self._mtimes.pop(chave, None)
+
+    def sincronizar(self, store):
+        """Atualiza só os backups novos, alterados ou removidos desde a última chamada.
+
+        Depois da primeira carga, as mudanças vêm do diário do `BackupStore` (inclusive as
+        gravadas por outros processos), sem percorrer o índice inteiro.
+        """
+        with self._lock, etapa("busca.sincronizar"):
+            if store.versao == self._versao_store:
+                return
+            mudancas = None if self._versao_store is None else store.mudancas_desde(self._versao_store)
+            if mudancas is None:
+                self._versao_store = store.versao
+                registros = store.registros()
+                removidos = self.campos.keys() - {registro[0] for registro in registros}
+            else:
+                self._versao_store, registros, removidos = mudancas
+            for chave, mtime_ns, *campos in registros:
+                if self._mtimes.get(chave) != mtime_ns:
+                    self.atualizar(chave, campos)
+                    self._mtimes[chave] = mtime_ns
+            for chave in removidos:
+                self.remover(chave)
+
+    def rascunhos(self, limite=10):
+        """Chaves dos backups ainda sem nome de cliente, dos alterados por último aos mais antigos."""
+        with self._lock:
+            chaves = [chave for chave, campos in self.campos.items() if not campos[0]]
+            return sorted(chaves, key=lambda chave: self._mtimes.get(chave, 0), reverse=True)[:limite]
+
+    def _pontuar_termo(self, termo):
+        """Pontuação de cada backup para um termo: 1 para prefixo exato, senão a similaridade."""
+        pontos = {}
+        inicio = bisect.bisect_left(self._palavras_ordenadas, termo)
+        for palavra in self._palavras_ordenadas[inicio:]:
+            if not palavra.startswith(termo):
+                break
+            for chave in self._chaves_palavra[palavra]:
+                pontos[chave] = 1.0
+        if len(termo) >= 3:
+            trigramas = _trigramas(termo)
+            comuns = {}
+            for trigrama in trigramas:
+                for palavra in self._palavras_trigrama.get(trigrama, ()):
+                    comuns[palavra] = comuns.get(palavra, 0) + 1
+            for palavra, n in comuns.items():
+                similaridade = 2 * n / (len(trigramas) + len(_trigramas(palavra)))
+                if similaridade >= SIMILARIDADE_MINIMA:
+                    for chave in self._chaves_palavra[palavra]:
+                        if pontos.get(chave, 0) < similaridade:
+                            pontos[chave] = similaridade
+        return pontos
+
+    def buscar(self, consulta, limite=50):
+        """Chaves dos backups que casam com todos os termos da consulta, das mais parecidas às menos."""
+        termos = normalizar(consulta).split()
+        if not termos:
+            return []
+        with self._lock, etapa("busca.buscar"):
+            total = None
+            for termo in termos:
+                pontos = self._pontuar_termo(termo)
+                if total is None:
+                    total = pontos
+                else:
+                    total = {chave: total[chave] + p for chave, p in pontos.items() if chave in total}
+                if not total:
+                    return []
+        return sorted(total, key=lambda chave: (-total[chave], chave))[:limite]
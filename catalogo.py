@@ -0,0 +1,238 @@
+"""Catálogo de itens e preços, com busca por prefixo no nome e no material, e entrada de itens em lote.
+
+O catálogo é um CSV (ou uma tabela `catalogo` num SQLite) com as colunas Item,
+Material, Especificações e Preço Unit; o cabeçalho pode vir sem acento e em
+qualquer ordem. Números aceitam o formato brasileiro ("R$ 1.234,56").
+"""
+import os
+import re
+import csv
+import bisect
+import sqlite3
+import threading
+
+from busca_clientes import normalizar
+from modelo_orcamento import ItemOrcamento
+
+# Arquivo do catálogo (CSV, ou SQLite pela extensão); pode ser trocado por ORCAMENTO_CATALOGO
+CATALOGO_PADRAO = os.environ.get("ORCAMENTO_CATALOGO", "catalogo.csv")
+EXTENSOES_SQLITE = (".db", ".sqlite", ".sqlite3")
+
+# Nome normalizado da coluna -> campo do ItemOrcamento
+_COLUNAS = {
+    'item': 'nome', 'nome': 'nome', 'descricao': 'nome',
+    'qtd': 'qtd', 'quantidade': 'qtd',
+    'material': 'material',
+    'especificacoes': 'especificacoes', 'especificacao': 'especificacoes',
+    'preco unit': 'preco_unit', 'preco unitario': 'preco_unit', 'preco': 'preco_unit', 'valor': 'preco_unit',
+}
+# Ordem das colunas de uma tabela colada sem cabeçalho
+ORDEM_SEM_CABECALHO = ('nome', 'qtd', 'preco_unit', 'material', 'especificacoes')
+
+# Formatos de número aceitos: "1.500" (ponto de milhar), "1.234,56" / "99,90" e "1234.5"
+_NUMERO_MILHAR = re.compile(r"-?\d{1,3}(\.\d{3})+")
+_NUMERO_VIRGULA = re.compile(r"-?(\d{1,3}(\.\d{3})+|\d+),\d+")
+_NUMERO_PONTO = re.compile(r"-?\d+(\.\d+)?")
+
+
+def ler_numero(texto):
+    """Converte "1.234,56", "R$ 1.500", "99,90" ou "1234.5" em float.
+
+    Ponto seguido de grupos de três dígitos é separador de milhar. Formatos
+    ambíguos (como "1,234.56") dão ValueError em vez de um valor adivinhado.
+    """
+    texto = str(texto).replace("R$", "").replace(" ", "").strip()
+    if _NUMERO_MILHAR.fullmatch(texto):
+        return float(texto.replace(".", ""))
+    if _NUMERO_VIRGULA.fullmatch(texto):
+        return float(texto.replace(".", "").replace(",", "."))
+    if _NUMERO_PONTO.fullmatch(texto):
+        return float(texto)
+    raise ValueError(f"número inválido: {texto!r}")
+
+
+def ler_inteiro(texto):
+    valor = ler_numero(texto)
+    if not valor.is_integer():
+        raise ValueError(f"quantidade deve ser um número inteiro: {texto!r}")
+    return int(valor)
+
+
+def _celula_sqlite(valor):
+    # REAL vira texto com vírgula decimal: "1.125" seria lido como mil cento e vinte e cinco
+    if valor is None:
+        return ""
+    return str(valor).replace(".", ",") if isinstance(valor, float) else str(valor)
+
+
+def _mapear_cabecalho(linha):
+    campos = [_COLUNAS.get(normalizar(celula)) for celula in linha]
+    return campos if 'nome' in campos else None
+
+
+class _PontoEVirgula(csv.excel):
+    delimiter = ";"
+
+
+def _linhas_csv(texto):
+    # A vírgula pode ser decimal ("1500,00"), então tab (colado da planilha) e ponto e
+    # vírgula têm preferência; só sem eles o Sniffer escolhe o separador
+    linhas = [linha for linha in texto.splitlines() if linha.strip()]
+    if "\t" in texto:
+        dialeto = csv.excel_tab
+    elif linhas and all(";" in linha for linha in linhas):
+        dialeto = _PontoEVirgula
+    else:
+        try:
+            dialeto = csv.Sniffer().sniff(texto[:4096], delimiters=";,")
+        except csv.Error:
+            dialeto = csv.excel
+    return [linha for linha in csv.reader(linhas, dialeto) if any(c.strip() for c in linha)]
+
+
+def _item_da_linha(campos, linha, catalogo=None):
+    valores = {campo: celula.strip() for campo, celula in zip(campos, linha) if campo and celula.strip()}
+    nome = valores.get('nome')
+    if not nome:
+        raise ValueError("sem nome do item")
+    qtd = ler_inteiro(valores['qtd']) if 'qtd' in valores else 1
+    if qtd < 1:
+        raise ValueError("quantidade deve ser pelo menos 1")
+    material = valores.get('material', '')
+    especificacoes = valores.get('especificacoes', '')
+    if 'preco_unit' in valores:
+        preco_unit = ler_numero(valores['preco_unit'])
+    else:
+        # Sem preço na linha: usa o do catálogo (e o material/especificações de lá, se faltarem)
+        modelo = catalogo.procurar(nome, material) if catalogo else None
+        if modelo is None:
+            raise ValueError("sem preço e não encontrado no catálogo")
+        preco_unit = modelo.preco_unit
+        material = material or modelo.material
+        especificacoes = especificacoes or modelo.especificacoes
+    if preco_unit <= 0:
+        raise ValueError("preço deve ser maior que zero")
+    return ItemOrcamento(nome, qtd, especificacoes, material, preco_unit)
+
+
+def interpretar_itens(texto, catalogo=None):
+    """Itens de uma tabela colada (planilha, CSV com ; , ou tab) para entrar de uma vez no orçamento.
+
+    Sem cabeçalho, as colunas são Item, Qtd, Preço Unit, Material, Especificações.
+    Devolve (itens, erros), com erros como (número da linha, conteúdo, motivo).
+    """
+    linhas = _linhas_csv(texto)
+    if not linhas:
+        return [], []
+    campos = _mapear_cabecalho(linhas[0])
+    inicio = 2 if campos else 1
+    if campos:
+        linhas = linhas[1:]
+    else:
+        campos = list(ORDEM_SEM_CABECALHO)
+    itens, erros = [], []
+    for numero, linha in enumerate(linhas, inicio):
+        try:
+            itens.append(_item_da_linha(campos, linha, catalogo))
+        except (ValueError, IndexError) as e:
+            erros.append((numero, " | ".join(linha), str(e)))
+    return itens, erros
+
+
+class Catalogo:
+    """Itens do catálogo com índice de palavras (ordenado, para busca por prefixo)."""
+
+    def __init__(self, itens=()):
+        self.itens = list(itens)
+        self._nomes = [normalizar(item.nome) for item in self.itens]
+        self._por_nome = {}
+        self._palavras = {}
+        for i, item in enumerate(self.itens):
+            self._por_nome.setdefault((self._nomes[i], normalizar(item.material)), i)
+            self._por_nome.setdefault((self._nomes[i], ''), i)
+            for palavra in set(normalizar(f"{item.nome} {item.material}").split()):
+                self._palavras.setdefault(palavra, set()).add(i)
+        self._ordenadas = sorted(self._palavras)
+
+    @classmethod
+    def carregar(cls, caminho):
+        if caminho.lower().endswith(EXTENSOES_SQLITE):
+            conn = sqlite3.connect(f"file:{caminho}?mode=ro", uri=True)
+            try:
+                cursor = conn.execute("SELECT * FROM catalogo")
+                linhas = [[d[0] for d in cursor.description]] + [[_celula_sqlite(v) for v in l] for l in cursor]
+            finally:
+                conn.close()
+        else:
+            with open(caminho, 'r', encoding='utf-8-sig', newline='') as f:
+                linhas = _linhas_csv(f.read())
+        campos = _mapear_cabecalho(linhas[0]) if linhas else None
+        if not campos:
+            raise ValueError(f"{caminho}: o cabeçalho precisa ter a coluna Item")
+        itens = []
+        for numero, linha in enumerate(linhas[1:], 2):
+            try:
+                itens.append(_item_da_linha(campos, linha))
+            except (ValueError, IndexError) as e:
+                print(f"Catálogo {caminho}, linha {numero} ignorada:", e)
+        return cls(itens)
+
+    def __len__(self):
+        return len(self.itens)
+
+    def _com_prefixo(self, termo):
+        encontrados = set()
+        inicio = bisect.bisect_left(self._ordenadas, termo)
+        for palavra in self._ordenadas[inicio:]:
+            if not palavra.startswith(termo):
+                break
+            encontrados |= self._palavras[palavra]
+        return encontrados
+
+    def buscar(self, consulta, limite=20):
+        """Itens cujo nome ou material tem palavras começando por todos os termos da consulta."""
+        termos = normalizar(consulta).split()
+        if not termos:
+            return []
+        indices = None
+        for termo in termos:
+            encontrados = self._com_prefixo(termo)
+            indices = encontrados if indices is None else indices & encontrados
+            if not indices:
+                return []
+        inicio = normalizar(consulta)
+        # Nomes que começam pela consulta primeiro, depois ordem alfabética
+        ordem = sorted(indices, key=lambda i: (not self._nomes[i].startswith(inicio), self._nomes[i], i))
+        return [self.itens[i] for i in ordem[:limite]]
+
+    def procurar(self, nome, material=''):
+        """Item com exatamente este nome (e material, se informado), sem diferenciar acentos; ou None."""
+        i = self._por_nome.get((normalizar(nome), normalizar(material)))
+        return None if i is None else self.itens[i]
+
+
+class ArquivoCatalogo:
+    """Catálogo lido de um arquivo e recarregado só quando o mtime muda."""
+
+    def __init__(self, caminho=CATALOGO_PADRAO):
+        self.caminho = caminho
+        self.erro = None
+        self._mtime = None
+        self._catalogo = Catalogo()
+        self._lock = threading.Lock()
+
+    def atual(self):
+        try:
+            mtime_ns = os.stat(self.caminho).st_mtime_ns
+        except OSError:
+            mtime_ns = None
+        with self._lock:
+            if mtime_ns != self._mtime:
+                self._mtime = mtime_ns
+                self.erro = None
+                try:
+                    self._catalogo = Catalogo.carregar(self.caminho) if mtime_ns else Catalogo()
+                except Exception as e:
+                    self.erro = str(e)
+                    self._catalogo = Catalogo()
+            return self._catalogo
@@ -0,0 +1,347 @@
+import os
+import re
+import copy
+import json
+import hashlib
+import functools
+import threading
+import time
+import importlib.util
+from io import BytesIO
+from datetime import date
+from collections import OrderedDict
+
+from backup_store import gravar_json_atomico
+from instrumentacao import etapa, contar
+
+# Entra no hash do cache: aumente quando a saída de `extrair_dados_pdf` mudar
+VERSAO_EXTRATOR = 3
+# Subpasta (dentro do diretório de backups) do cache em disco das extrações
+DIRETORIO_CACHE_EXTRACAO = ".cache_extracao"
+# Modo diagnóstico ligado por padrão (ORCAMENTO_DIAGNOSTICO=1); também pode ser ligado na barra lateral
+DIAGNOSTICO_PADRAO = os.environ.get("ORCAMENTO_DIAGNOSTICO", "").lower() in ("1", "true", "sim")
+
+
+# Usar pdfplumber em vez de PyPDF2 para extração mais confiável. Ele só é importado
+# na primeira extração, para não pesar na abertura do app.
+@functools.lru_cache(maxsize=None)
+def pdfplumber_disponivel():
+    return importlib.util.find_spec("pdfplumber") is not None
+
+
+# Linhas que vêm logo depois da tabela de itens; nenhuma tabela é procurada nas páginas seguintes
+_FIM_DOS_ITENS = re.compile(r'^(?:total geral|valor final|condições)\s*:', re.MULTILINE)
+
+
+# Campos gerais: (campo, padrão, formatação). Os padrões rodam sobre o texto já em
+# minúsculas e por isso não usam re.IGNORECASE, que impede o `re` de localizar o
+# rótulo pela busca rápida de prefixo literal (cerca de 15x mais lento).
+_PADROES_CAMPOS = [
+    ('cliente_nome', re.compile(r'cliente[:\s]+(.+?)(?:\n|telefone)'), str.title),
+    ('cliente_telefone', re.compile(r'telefone[:\s]+(.+?)(?:\n|endereço)'), None),
+    ('cliente_endereco', re.compile(r'endereço[:\s]+(.+?)(?:\n{2,}|item)', re.DOTALL), str.title),
+    ('prazo', re.compile(r'prazo de entrega[:\s]+(.+?)(?:\n|forma)'), str.title),
+    ('pagamento', re.compile(r'forma de pagamento[:\s]+(.+?)(?:\n|orçamento)'), str.title),
+    ('orcamento_valido_por', re.compile(r'orçamento válido por[:\s]+(.+?)(?:\n|observações)'), str.title),
+    ('observacao', re.compile(r'observações[:\s]+(.+?)(?:\n{2,}|itens inclusos)', re.DOTALL), str.capitalize),
+    ('itens_inclusos', re.compile(r'itens inclusos[:\s]+(.+?)(?:\n{2,}|itens não inclusos)', re.DOTALL), str.capitalize),
+    ('itens_nao_inclusos', re.compile(r'itens não inclusos[:\s]+(.+?)(?:\n{2,}|móveis conforme|$)', re.DOTALL), str.capitalize),
+    ('projetos_nome', re.compile(r'projetos[:\s]+(.+)$'), str.title),
+]
+
+
+# Linha "Data: dd/mm/aaaa" do cabeçalho, guardada como aaaa-mm-dd em `data_orcamento`
+_PADRAO_DATA = re.compile(r'^data[:\s]+(\d{1,2})/(\d{1,2})/(\d{4})', re.MULTILINE)
+
+
+def extrair_campos_gerais(texto_completo):
+    """Dados do cliente e condições encontrados no texto do PDF."""
+    texto_lower = texto_completo.lower()
+    campos = {}
+    for campo, padrao, formatar in _PADROES_CAMPOS:
+        match = padrao.search(texto_lower)
+        if match:
+            valor = match.group(1).strip()
+            campos[campo] = formatar(valor) if formatar else valor
+    match = _PADRAO_DATA.search(texto_lower)
+    if match:
+        dia, mes, ano = (int(g) for g in match.groups())
+        try:
+            campos['data_orcamento'] = date(ano, mes, dia).isoformat()
+        except ValueError:
+            pass
+    return campos
+
+
+def extrair_itens_tabelas(tabelas):
+    """Itens das tabelas detectadas pelo pdfplumber."""
+    itens = []
+    for tabela in tabelas:
+        if not tabela or len(tabela) < 2:
+            continue
+
+        cabecalho = [h.lower() if h else '' for h in tabela[0]]
+        idx_item = idx_qtd = idx_espec = idx_material = idx_subtotal = -1
+        for i, col in enumerate(cabecalho):
+            if 'item' in col:
+                idx_item = i
+            elif 'qtd' in col or 'quantidade' in col:
+                idx_qtd = i
+            elif 'especificações' in col or 'especificacao' in col:
+                idx_espec = i
+            elif 'material' in col:
+                idx_material = i
+            elif 'subtotal' in col or 'valor' in col:
+                idx_subtotal = i
+
+        for linha in tabela[1:]:
+            if any(keyword in (''.join(linha).lower()) for keyword in ['total', 'condições', 'observações']):
+                continue
+
+            item_nome = ''
+            qtd = 1
+            especificacoes = ''
+            material = ''
+            subtotal = 0.0
+
+            if idx_item != -1 and len(linha) > idx_item and linha[idx_item]:
+                item_nome = linha[idx_item].strip()
+            if idx_qtd != -1 and len(linha) > idx_qtd and linha[idx_qtd]:
+                try:
+                    qtd = int(re.search(r'\d+', linha[idx_qtd]).group())
+                except:
+                    qtd = 1
+            if idx_espec != -1 and len(linha) > idx_espec and linha[idx_espec]:
+                especificacoes = linha[idx_espec].strip()
+            if idx_material != -1 and len(linha) > idx_material and linha[idx_material]:
+                material = linha[idx_material].strip()
+            if idx_subtotal != -1 and len(linha) > idx_subtotal and linha[idx_subtotal]:
+                valor_str = re.search(r'[\d\.,]+', linha[idx_subtotal])
+                if valor_str:
+                    subtotal_str = valor_str.group().replace('.', '').replace(',', '.')
+                    try:
+                        subtotal = float(subtotal_str)
+                    except:
+                        subtotal = 0.0
+
+            preco_unit = subtotal / qtd if qtd > 0 and subtotal > 0 else subtotal
+
+            if item_nome and subtotal > 0:
+                itens.append({
+                    'Item': item_nome,
+                    'Qtd': qtd,
+                    'Especificações': especificacoes,
+                    'Material': material,
+                    'Preço Unit': round(preco_unit, 2),
+                    'Subtotal': round(subtotal, 2)
+                })
+    return itens
+
+
+def extrair_itens_texto(texto_completo):
+    """Itens lidos linha a linha do texto, quando nenhuma tabela foi reconhecida."""
+    itens = []
+    linhas = texto_completo.splitlines()
+    capturando = False
+    for linha in linhas:
+        low = linha.lower()
+        if ('item' in low and 'qtd' in low and 'subtotal' in low) or ('item' in low and 'subtotal' in low):
+            capturando = True
+            continue
+        if capturando:
+            if 'total geral' in low or 'valor final' in low or 'condições' in low:
+                break
+            if re.search(r'r\$\s?\d', linha, re.IGNORECASE):
+                subtimos = re.findall(r'R\$\s*([\d\.,]+)', linha)
+                if not subtimos:
+                    continue
+                subtotal_str = subtimos[-1].replace('.', '').replace(',', '.')
+                try:
+                    subtotal = float(subtotal_str)
+                except:
+                    continue
+                partes = linha.split()
+                qtd = 1
+                nome_parts = []
+                for p in partes:
+                    if re.fullmatch(r'\d+', p):
+                        qtd = int(p)
+                        continue
+                    if 'r$' in p.lower():
+                        break
+                    nome_parts.append(p)
+                nome_item = ' '.join(nome_parts).strip()
+                if nome_item:
+                    preco_unit = subtotal / qtd if qtd > 0 else subtotal
+                    itens.append({
+                        'Item': nome_item,
+                        'Qtd': qtd,
+                        'Especificações': '',
+                        'Material': '',
+                        'Preço Unit': round(preco_unit, 2),
+                        'Subtotal': round(subtotal, 2)
+                    })
+    return itens
+
+
+def ler_paginas(pdf, tempos=None):
+    """Gera (texto, tabelas) página a página, liberando o layout de cada uma depois do uso.
+
+    A detecção de tabelas (a parte mais cara) para na página onde aparece o fim da
+    tabela de itens; nas seguintes só o texto é extraído. Se `tempos` for uma lista,
+    recebe a duração de cada etapa por página (modo diagnóstico).
+    """
+    procurar_tabelas = True
+    for numero, page in enumerate(pdf.pages, 1):
+        try:
+            inicio = time.perf_counter() if tempos is not None else 0
+            texto = page.extract_text()
+            meio = time.perf_counter() if tempos is not None else 0
+            tabelas = []
+            if procurar_tabelas:
+                tabelas = page.extract_tables()
+                if texto and _FIM_DOS_ITENS.search(texto.lower()):
+                    procurar_tabelas = False
+            if tempos is not None:
+                tempos.append({'pagina': numero, 'texto_s': round(meio - inicio, 4),
+                               'tabelas_s': round(time.perf_counter() - meio, 4), 'tabelas': len(tabelas)})
+        finally:
+            page.close()
+        yield texto, tabelas
+
+
+def gravar_diagnostico(destino, texto_completo, tabelas, tempos):
+    """Grava o texto bruto, as tabelas detectadas e os tempos por página de uma importação."""
+    try:
+        os.makedirs(destino, exist_ok=True)
+        with open(os.path.join(destino, "texto_extraido.txt"), "w", encoding="utf-8") as f:
+            f.write(texto_completo)
+        with open(os.path.join(destino, "tabelas.json"), "w", encoding="utf-8") as f:
+            json.dump(tabelas, f, ensure_ascii=False, indent=2)
+        with open(os.path.join(destino, "tempos_paginas.json"), "w", encoding="utf-8") as f:
+            json.dump(tempos, f, ensure_ascii=False, indent=2)
+    except Exception as e:
+        print("Não foi possível gravar o diagnóstico em", destino, e)
+
+
+def extrair_dados_pdf(pdf_file, diagnostico=None):
+    """Extrai informações do PDF do orçamento usando pdfplumber.
+
+    Com `diagnostico` (uma pasta), grava ali os artefatos da importação.
+    """
+    if not pdfplumber_disponivel():
+        raise RuntimeError("pdfplumber não está instalado. Instale com: pip install pdfplumber")
+    import pdfplumber
+
+    dados = {
+        'cliente_nome': '',
+        'cliente_telefone': '',
+        'cliente_endereco': '',
+        'projetos_nome': '',
+        'prazo': '',
+        'pagamento': '',
+        'orcamento_valido_por': '',
+        'observacao': '',
+        'itens_inclusos': '',
+        'itens_nao_inclusos': '',
+        'data_orcamento': '',
+        'itens': []
+    }
+
+    with etapa("pdf.extracao_pdfplumber"), pdfplumber.open(pdf_file) as pdf:
+        textos = []
+        tabelas = []
+        tempos = [] if diagnostico else None
+        for texto, tabelas_pagina in ler_paginas(pdf, tempos):
+            if texto:
+                textos.append(texto + "\n")
+            tabelas.extend(tabelas_pagina)
+        contar("pdf.paginas_lidas", len(pdf.pages))
+    texto_completo = "".join(textos)
+
+    if diagnostico:
+        gravar_diagnostico(diagnostico, texto_completo, tabelas, tempos)
+
+    with etapa("pdf.extracao_campos"):
+        dados.update(extrair_campos_gerais(texto_completo))
+        dados['itens'] = extrair_itens_tabelas(tabelas) or extrair_itens_texto(texto_completo)
+    return dados
+
+
+def hash_conteudo(conteudo):
+    return hashlib.sha256(f"v{VERSAO_EXTRATOR}:".encode() + conteudo).hexdigest()
+
+
+def hash_arquivo(caminho, bloco=1024 * 1024):
+    """O mesmo que `hash_conteudo` do conteúdo do arquivo, lido aos pedaços."""
+    h = hashlib.sha256(f"v{VERSAO_EXTRATOR}:".encode())
+    with open(caminho, 'rb') as f:
+        for pedaco in iter(lambda: f.read(bloco), b''):
+            h.update(pedaco)
+    return h.hexdigest()
+
+
+class CacheExtracao:
+    """Resultados de `extrair_dados_pdf` memorizados pelo hash do conteúdo do PDF.
+
+    Mantém um LRU em memória e, se `diretorio` for informado, uma cópia em disco
+    que sobrevive a reinícios (usada também pela importação em lote).
+    """
+
+    def __init__(self, max_itens=64, diretorio=None):
+        self.max_itens = max_itens
+        self.diretorio = diretorio
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+        if diretorio:
+            os.makedirs(diretorio, exist_ok=True)
+
+    def _caminho(self, chave):
+        return os.path.join(self.diretorio, f"{chave}.json")
+
+    def obter(self, chave):
+        """Resultado já extraído para este hash, ou None."""
+        with self._lock:
+            dados = self._itens.get(chave)
+            if dados is not None:
+                self._itens.move_to_end(chave)
+                return copy.deepcopy(dados)
+        if not self.diretorio:
+            return None
+        try:
+            with open(self._caminho(chave), 'r', encoding='utf-8') as f:
+                dados = json.load(f)
+        except (OSError, ValueError):
+            return None
+        self._guardar_memoria(chave, dados)
+        return copy.deepcopy(dados)
+
+    def _guardar_memoria(self, chave, dados):
+        with self._lock:
+            self._itens[chave] = dados
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+
+    def guardar(self, chave, dados):
+        dados = copy.deepcopy(dados)
+        self._guardar_memoria(chave, dados)
+        if self.diretorio:
+            gravar_json_atomico(self._caminho(chave), dados)
+
+    def extrair(self, conteudo, diagnostico_dir=None):
+        """Extrai os dados dos bytes de um PDF, reaproveitando o resultado se já foi processado.
+
+        Com `diagnostico_dir`, o PDF é processado de novo uma vez para gravar seus
+        artefatos em uma subpasta com o início do hash.
+        """
+        chave = hash_conteudo(conteudo)
+        destino = os.path.join(diagnostico_dir, chave[:12]) if diagnostico_dir else None
+        dados = None if destino and not os.path.isdir(destino) else self.obter(chave)
+        if dados is None:
+            contar("extracao.cache_falha")
+            dados = extrair_dados_pdf(BytesIO(conteudo), diagnostico=destino)
+            self.guardar(chave, dados)
+        else:
+            contar("extracao.cache_acerto")
+        return dados
@@ -0,0 +1,184 @@
+"""Histórico de versões dos orçamentos, guardado como diferenças entre versões.
+
+Cada backup com histórico ganha um arquivo `backups/.historico/<chave>.jsonl`, só de
+acréscimo: uma linha por versão, com o orçamento completo a cada
+`intervalo_checkpoint` versões e, nas demais, só o que mudou desde a anterior. O
+estado mais recente continua sendo gravado como backup comum (`BackupStore.salvar`).
+"""
+import os
+import json
+import threading
+from datetime import datetime
+from difflib import SequenceMatcher
+
+from backup_store import BACKUP_DIR
+from instrumentacao import etapa
+
+# Subpasta (dentro do diretório de backups) dos históricos
+DIRETORIO_HISTORICO = ".historico"
+
+
+def _assinatura(item):
+    return json.dumps(item, sort_keys=True, ensure_ascii=False)
+
+
+def calcular_delta(antes, depois):
+    """Diferença entre duas versões: campos alterados/removidos e os itens reconstruídos.
+
+    Os itens viram uma lista de trechos: `[i, j]` copia `antes['itens'][i:j]` e um
+    dicionário é um item novo ou alterado.
+    """
+    delta = {}
+    campos = {k: v for k, v in depois.items() if k != 'itens' and antes.get(k) != v}
+    if campos:
+        delta['campos'] = campos
+    removidos = [k for k in antes if k != 'itens' and k not in depois]
+    if removidos:
+        delta['removidos'] = removidos
+    itens_antes, itens_depois = antes.get('itens', []), depois.get('itens', [])
+    if itens_antes != itens_depois:
+        matcher = SequenceMatcher(None, [_assinatura(i) for i in itens_antes],
+                                  [_assinatura(i) for i in itens_depois], autojunk=False)
+        trechos = []
+        for op, i1, i2, j1, j2 in matcher.get_opcodes():
+            if op == 'equal':
+                trechos.append([i1, i2])
+            else:
+                trechos.extend(itens_depois[j1:j2])
+        delta['itens'] = trechos
+    return delta
+
+
+def aplicar_delta(antes, delta):
+    depois = {k: v for k, v in antes.items() if k not in delta.get('removidos', ())}
+    depois.update(delta.get('campos', {}))
+    if 'itens' in delta:
+        itens_antes = antes.get('itens', [])
+        itens = []
+        for trecho in delta['itens']:
+            if isinstance(trecho, list):
+                itens.extend(itens_antes[trecho[0]:trecho[1]])
+            else:
+                itens.append(trecho)
+        depois['itens'] = itens
+    return depois
+
+
+def resumir_diferencas(antes, depois):
+    """Itens adicionados, removidos e alterados e campos alterados entre duas versões."""
+    resumo = {
+        'campos': {k: (antes.get(k), depois.get(k)) for k in sorted(set(antes) | set(depois))
+                   if k not in ('itens', 'salvo_em') and antes.get(k) != depois.get(k)},
+        'itens_adicionados': [],
+        'itens_removidos': [],
+        'itens_alterados': [],
+    }
+    itens_antes, itens_depois = antes.get('itens', []), depois.get('itens', [])
+    matcher = SequenceMatcher(None, [_assinatura(i) for i in itens_antes],
+                              [_assinatura(i) for i in itens_depois], autojunk=False)
+    for op, i1, i2, j1, j2 in matcher.get_opcodes():
+        if op == 'equal':
+            continue
+        velhos, novos = itens_antes[i1:i2], itens_depois[j1:j2]
+        pares = min(len(velhos), len(novos)) if op == 'replace' else 0
+        resumo['itens_alterados'].extend(zip(velhos[:pares], novos[:pares]))
+        resumo['itens_removidos'].extend(velhos[pares:])
+        resumo['itens_adicionados'].extend(novos[pares:])
+    return resumo
+
+
+class HistoricoOrcamentos:
+    """Versões de cada backup, com restauração e comparação de qualquer versão."""
+
+    def __init__(self, store, backup_dir=BACKUP_DIR, intervalo_checkpoint=10):
+        self.store = store
+        self.intervalo_checkpoint = intervalo_checkpoint
+        self.diretorio = os.path.join(backup_dir, DIRETORIO_HISTORICO)
+        os.makedirs(self.diretorio, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def _caminho(self, backup_key):
+        return os.path.join(self.diretorio, f"{backup_key}.jsonl")
+
+    def _registros(self, backup_key):
+        try:
+            with open(self._caminho(backup_key), 'r', encoding='utf-8') as f:
+                linhas = f.readlines()
+        except FileNotFoundError:
+            return []
+        registros = []
+        for linha in linhas:
+            try:
+                registro = json.loads(linha)
+            except ValueError:
+                # Linha estragada por uma queda no meio da gravação: pula e segue lendo
+                continue
+            if not isinstance(registro, dict) or not isinstance(registro.get('versao'), int):
+                continue
+            anterior = registros[-1]['versao'] if registros else 0
+            # Um delta só vale sobre a versão imediatamente anterior; um checkpoint vale sozinho
+            if ('completo' in registro and registro['versao'] > anterior) or \
+                    (registros and registro['versao'] == anterior + 1):
+                registros.append(registro)
+        return registros
+
+    def _cortar_linha_incompleta(self, backup_key):
+        # Sem isso, o próximo acréscimo seria colado no fim da linha que ficou pela metade
+        try:
+            with open(self._caminho(backup_key), 'rb+') as f:
+                conteudo = f.read()
+                if conteudo and not conteudo.endswith(b"\n"):
+                    f.truncate(conteudo.rfind(b"\n") + 1)
+        except FileNotFoundError:
+            pass
+
+    def _reconstruir(self, registros, posicao):
+        # Parte do último checkpoint até o registro pedido (posição a partir de 1)
+        inicio = max(i for i, r in enumerate(registros[:posicao]) if 'completo' in r)
+        dados = registros[inicio]['completo']
+        for registro in registros[inicio + 1:posicao]:
+            dados = aplicar_delta(dados, registro)
+        return dados
+
+    def versoes(self, backup_key):
+        """Lista de (número da versão, data de gravação)."""
+        return [(r['versao'], r['em']) for r in self._registros(backup_key)]
+
+    def carregar_versao(self, backup_key, versao):
+        registros = self._registros(backup_key)
+        posicoes = {r['versao']: i for i, r in enumerate(registros, 1)}
+        if versao not in posicoes:
+            raise KeyError(f"{backup_key} não tem a versão {versao}")
+        return self._reconstruir(registros, posicoes[versao])
+
+    def salvar_versao(self, backup_key, backup_data):
+        """Grava o backup e acrescenta uma versão ao histórico; devolve o número da versão."""
+        # A trava da chave (entre processos) cobre a leitura do histórico, o acréscimo e o backup
+        with self._lock, self.store.trava(backup_key), etapa("historico.salvar_versao"):
+            registros = self._registros(backup_key)
+            versao = registros[-1]['versao'] + 1 if registros else 1
+            registro = {'versao': versao, 'em': datetime.now().isoformat(timespec='seconds')}
+            if registros:
+                anterior = self._reconstruir(registros, len(registros))
+                if anterior == backup_data:
+                    return versao - 1
+            if not registros or (versao - 1) % self.intervalo_checkpoint == 0:
+                registro['completo'] = backup_data
+            else:
+                registro.update(calcular_delta(anterior, backup_data))
+            self._cortar_linha_incompleta(backup_key)
+            with open(self._caminho(backup_key), 'a', encoding='utf-8') as f:
+                f.write(json.dumps(registro, ensure_ascii=False, separators=(',', ':')) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self.store.salvar(backup_key, backup_data)
+            return versao
+
+    def restaurar(self, backup_key, versao):
+        """Volta o backup para uma versão antiga, registrando-a como a versão mais nova."""
+        dados = self.carregar_versao(backup_key, versao)
+        self.salvar_versao(backup_key, dados)
+        return dados
+
+    def comparar(self, backup_key, versao_a, versao_b):
+        return resumir_diferencas(self.carregar_versao(backup_key, versao_a), self.carregar_versao(backup_key, versao_b))
@@ -0,0 +1,120 @@
+"""Imagens do PDF (logo e fotos dos itens) já reduzidas ao tamanho em que são impressas.
+
+O logo original tem 1280x1280 px e sai no PDF com 1 polegada; sem redução, cada PDF
+carrega a imagem inteira. `CacheImagens` reduz e recodifica como JPEG uma vez por
+arquivo e tamanho, e só refaz quando o mtime do arquivo muda. JPEG entra no PDF
+sem ser decodificado de novo pelo reportlab.
+"""
+import os
+import hashlib
+import threading
+from io import BytesIO
+from collections import OrderedDict
+
+# Resolução das imagens reduzidas (pontos por polegada no PDF)
+DPI_IMAGENS = 200
+QUALIDADE_JPEG = 85
+# Subpasta (dentro do diretório de backups) das fotos de referência dos itens
+DIRETORIO_FOTOS = "fotos"
+EXTENSOES_FOTOS = (".jpg", ".jpeg", ".png", ".webp")
+
+
+def reduzir_imagem(conteudo, largura_max_px, altura_max_px):
+    """Reduz (sem ampliar) mantendo a proporção; devolve (bytes JPEG, largura_px, altura_px)."""
+    from PIL import Image, ImageOps
+
+    with Image.open(BytesIO(conteudo)) as imagem:
+        imagem = ImageOps.exif_transpose(imagem)
+        imagem.thumbnail((largura_max_px, altura_max_px), Image.LANCZOS)
+        if imagem.mode in ("RGBA", "LA", "P"):
+            # JPEG não tem transparência: o fundo transparente vira branco, como no papel
+            fundo = Image.new("RGB", imagem.size, "white")
+            imagem = imagem.convert("RGBA")
+            fundo.paste(imagem, mask=imagem.getchannel("A"))
+            imagem = fundo
+        elif imagem.mode != "RGB":
+            imagem = imagem.convert("RGB")
+        saida = BytesIO()
+        imagem.save(saida, "JPEG", quality=QUALIDADE_JPEG, optimize=True)
+        return saida.getvalue(), imagem.width, imagem.height
+
+
+def _gravar_atomico(caminho, conteudo):
+    # Como o `gravar_json_atomico` dos backups: temporário e rename, nunca um arquivo pela metade
+    temporario = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(temporario, 'wb') as f:
+            f.write(conteudo)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporario, caminho)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+
+
+def guardar_foto(conteudo, backup_dir, extensao=".jpg"):
+    """Grava a foto de um item em `backups/fotos/` com o hash do conteúdo no nome; devolve o nome."""
+    extensao = extensao.lower() if extensao.lower() in EXTENSOES_FOTOS else ".jpg"
+    nome = hashlib.sha256(conteudo).hexdigest()[:20] + extensao
+    diretorio = os.path.join(backup_dir, DIRETORIO_FOTOS)
+    os.makedirs(diretorio, exist_ok=True)
+    caminho = os.path.join(diretorio, nome)
+    try:
+        # Mesmo nome é mesmo conteúdo; só um arquivo de tamanho diferente (cortado por uma
+        # gravação antiga interrompida) é gravado de novo
+        if os.path.getsize(caminho) == len(conteudo):
+            return nome
+    except FileNotFoundError:
+        pass
+    _gravar_atomico(caminho, conteudo)
+    return nome
+
+
+def caminho_foto(backup_dir, nome):
+    # Só o nome do arquivo: um backup ou JSON da API não aponta para fora da pasta de fotos
+    return os.path.join(backup_dir, DIRETORIO_FOTOS, os.path.basename(nome)) if nome else None
+
+
+class CacheImagens:
+    """Imagens reduzidas em memória (LRU), por caminho e tamanho, invalidadas pelo mtime."""
+
+    def __init__(self, max_itens=128, dpi=DPI_IMAGENS):
+        self.max_itens = max_itens
+        self.dpi = dpi
+        self._imagens = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obter(self, caminho, largura_pt, altura_pt):
+        """(bytes JPEG, largura_pt, altura_pt) da imagem reduzida para caber na caixa, ou None.
+
+        None se o arquivo não existe ou não é uma imagem válida.
+        """
+        try:
+            mtime_ns = os.stat(caminho).st_mtime_ns
+        except (OSError, TypeError):
+            return None
+        chave = (caminho, largura_pt, altura_pt)
+        with self._lock:
+            guardada = self._imagens.get(chave)
+            if guardada is not None and guardada[0] == mtime_ns:
+                self._imagens.move_to_end(chave)
+                return guardada[1]
+        try:
+            with open(caminho, 'rb') as f:
+                conteudo = f.read()
+            jpeg, largura_px, altura_px = reduzir_imagem(conteudo, round(largura_pt * self.dpi / 72),
+                                                         round(altura_pt * self.dpi / 72))
+        except Exception as e:
+            print("Erro ao ler imagem:", caminho, e)
+            return None
+        # Ocupa a caixa toda na proporção da imagem, mesmo que o original seja pequeno
+        escala = min(largura_pt / largura_px, altura_pt / altura_px)
+        resultado = (jpeg, largura_px * escala, altura_px * escala)
+        with self._lock:
+            self._imagens[chave] = (mtime_ns, resultado)
+            self._imagens.move_to_end(chave)
+            while len(self._imagens) > self.max_itens:
+                self._imagens.popitem(last=False)
+        return resultado
@@ -0,0 +1,95 @@
+"""Tempo por etapa e contadores de cada rerun do app, para descobrir onde o tempo vai.
+
+As medições valem para a thread que chamou `iniciar` (cada sessão do Streamlit roda
+o script na sua própria thread). Sem medição ativa, `etapa` devolve sempre o mesmo
+gerenciador de contexto vazio e `contar` só faz uma consulta: o custo fica em
+torno de um acesso a atributo, e os módulos podem ser instrumentados sem cerimônia.
+
+    with etapa("pdf.doc_build"):
+        doc.build(elementos)
+    contar("extracao.cache_acerto")
+"""
+import os
+import json
+import time
+import threading
+from contextlib import nullcontext
+
+# Medição ligada por padrão (ORCAMENTO_MEDICOES=1); também pode ser ligada na barra lateral
+MEDICAO_PADRAO = os.environ.get("ORCAMENTO_MEDICOES", "").lower() in ("1", "true", "sim")
+# Arquivo JSON-lines (dentro do diretório de backups) com uma linha por rerun medido
+ARQUIVO_MEDICOES = ".medicoes.jsonl"
+
+_local = threading.local()
+_NULO = nullcontext()
+
+
+class Medicoes:
+    """Tempos acumulados por etapa (segundos e chamadas) e contadores de um rerun."""
+
+    __slots__ = ('inicio', 'relogio', 'etapas', 'contadores')
+
+    def __init__(self):
+        self.inicio = time.time()
+        self.relogio = time.perf_counter()
+        self.etapas = {}
+        self.contadores = {}
+
+    def total(self):
+        return time.perf_counter() - self.relogio
+
+    def para_dict(self, **extras):
+        return {
+            'em': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.inicio)),
+            'total_s': round(self.total(), 4),
+            'etapas': {nome: {'s': round(s, 4), 'chamadas': n} for nome, (s, n) in self.etapas.items()},
+            'contadores': dict(self.contadores),
+            **extras,
+        }
+
+
+class _Etapa:
+    __slots__ = ('medicoes', 'nome', 'comeco')
+
+    def __init__(self, medicoes, nome):
+        self.medicoes = medicoes
+        self.nome = nome
+
+    def __enter__(self):
+        self.comeco = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        duracao = time.perf_counter() - self.comeco
+        segundos, chamadas = self.medicoes.etapas.get(self.nome, (0.0, 0))
+        self.medicoes.etapas[self.nome] = (segundos + duracao, chamadas + 1)
+        return False
+
+
+def iniciar(ativo=True):
+    """Começa a medir nesta thread (ou desliga, com `ativo=False`); devolve as medições ou None."""
+    _local.medicoes = Medicoes() if ativo else None
+    return _local.medicoes
+
+
+def atuais():
+    return getattr(_local, 'medicoes', None)
+
+
+def etapa(nome):
+    medicoes = getattr(_local, 'medicoes', None)
+    if medicoes is None:
+        return _NULO
+    return _Etapa(medicoes, nome)
+
+
+def contar(nome, quantidade=1):
+    medicoes = getattr(_local, 'medicoes', None)
+    if medicoes is not None:
+        medicoes.contadores[nome] = medicoes.contadores.get(nome, 0) + quantidade
+
+
+def exportar_jsonl(medicoes, caminho, **extras):
+    """Acrescenta as medições como uma linha JSON em `caminho`."""
+    with open(caminho, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(medicoes.para_dict(**extras), ensure_ascii=False, separators=(',', ':')) + "\n")
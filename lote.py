@@ -0,0 +1,176 @@
+import os
+import re
+import json
+import fnmatch
+import zipfile
+from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor, as_completed, wait, FIRST_COMPLETED
+
+from backup_store import BACKUP_DIR
+from extracao_pdf import extrair_dados_pdf, hash_conteudo, hash_arquivo
+from pdf_orcamento import ModeloOrcamentoPDF, localizar_logo, EMPRESA_NOME_PADRAO, EMPRESA_ENDERECO_PADRAO
+
+# Modelo de PDF de cada processo do pool (montado uma vez no initializer)
+_modelo = None
+# PDFs enviados ao pool de uma vez, por processo; os seguintes só são lidos quando um termina
+PDFS_POR_PROCESSO = 2
+# Detalhe do relatório de um PDF cujo backup já existe (e não foi sobrescrito)
+JA_IMPORTADO = "já importado"
+
+
+def _iniciar_worker_pdf(logo_path, backup_dir):
+    global _modelo
+    _modelo = ModeloOrcamentoPDF(logo_path, backup_dir)
+
+
+def _gerar_pdf_backup(caminho, empresa):
+    chave = os.path.basename(caminho)[:-5]
+    with open(caminho, 'r', encoding='utf-8') as f:
+        # A empresa informada vale sobre a do backup; o padrão só entra se o backup não tiver
+        dados = {'empresa_nome': EMPRESA_NOME_PADRAO, 'empresa_endereco': EMPRESA_ENDERECO_PADRAO,
+                 **json.load(f), **empresa}
+    return chave, _modelo.gerar_pdf(dados)
+
+
+def listar_backups(backup_dir=BACKUP_DIR, padrao=None, cliente=None):
+    """Caminhos dos backups JSON, filtrados pelo padrão da chave e/ou nome do cliente."""
+    caminhos = []
+    for filename in sorted(os.listdir(backup_dir)):
+        if not filename.endswith(".json"):
+            continue
+        if padrao and not fnmatch.fnmatch(filename[:-5], padrao):
+            continue
+        caminho = os.path.join(backup_dir, filename)
+        if cliente:
+            try:
+                with open(caminho, 'r', encoding='utf-8') as f:
+                    if json.load(f).get('cliente_nome') != cliente:
+                        continue
+            except Exception as e:
+                print("Erro ao ler backup JSON:", filename, e)
+                continue
+        caminhos.append(caminho)
+    return caminhos
+
+
+def gerar_pdfs_em_lote(caminhos, saida_dir=None, zip_path=None, processos=None,
+                       empresa_nome=None, empresa_endereco=None, backup_dir=BACKUP_DIR):
+    """Gera um PDF por backup em paralelo, gravando numa pasta e/ou num único zip.
+
+    `empresa_nome`/`empresa_endereco`, se informados, substituem os gravados em cada
+    backup. As fotos dos itens são lidas de `backup_dir/fotos/`. Devolve a lista de
+    (chave, erro) dos backups que falharam.
+    """
+    empresa = {campo: valor for campo, valor in
+               (('empresa_nome', empresa_nome), ('empresa_endereco', empresa_endereco)) if valor is not None}
+    if saida_dir:
+        os.makedirs(saida_dir, exist_ok=True)
+    falhas = []
+    arquivo_zip = zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) if zip_path else None
+    try:
+        with ProcessPoolExecutor(max_workers=processos, initializer=_iniciar_worker_pdf,
+                                 initargs=(localizar_logo(backup_dir), backup_dir)) as executor:
+            futuros = {executor.submit(_gerar_pdf_backup, caminho, empresa): caminho for caminho in caminhos}
+            for futuro in as_completed(futuros):
+                chave = os.path.basename(futuros[futuro])[:-5]
+                try:
+                    chave, pdf_bytes = futuro.result()
+                except Exception as e:
+                    falhas.append((chave, str(e)))
+                    continue
+                # Só o processo principal escreve no disco/zip
+                if arquivo_zip:
+                    arquivo_zip.writestr(f"{chave}.pdf", pdf_bytes)
+                if saida_dir:
+                    with open(os.path.join(saida_dir, f"{chave}.pdf"), 'wb') as f:
+                        f.write(pdf_bytes)
+    finally:
+        if arquivo_zip:
+            arquivo_zip.close()
+    return falhas
+
+
+def _extrair_pdf(origem, diagnostico):
+    # `origem` é o caminho do arquivo (CLI), lido pelo próprio processo, ou os bytes enviados pelo upload
+    return extrair_dados_pdf(BytesIO(origem) if isinstance(origem, bytes) else origem, diagnostico=diagnostico)
+
+
+def chave_importacao(nome_pdf):
+    base = os.path.splitext(os.path.basename(nome_pdf))[0]
+    return "importado_" + re.sub(r'[^\w\-]+', '_', base).strip('_')
+
+
+def listar_pdfs(pasta):
+    return [os.path.join(pasta, nome) for nome in sorted(os.listdir(pasta)) if nome.lower().endswith(".pdf")]
+
+
+def _hash_origem(origem):
+    return hash_conteudo(origem) if isinstance(origem, bytes) else hash_arquivo(origem)
+
+
+def importar_pdfs_em_lote(arquivos, store, processos=None, cache=None, diagnostico_dir=None, sobrescrever=False):
+    """Extrai vários PDFs em paralelo e grava cada um nos backups assim que termina.
+
+    `arquivos` é uma lista de (nome, caminho ou bytes). PDFs cujo backup já existe
+    são pulados (relatados como `JA_IMPORTADO`), para não apagar o que foi editado
+    depois da importação, a menos que `sobrescrever` seja verdadeiro. Com um
+    `CacheExtracao`, PDFs já processados não são extraídos de novo. Com
+    `diagnostico_dir`, cada PDF é extraído (mesmo se estiver no cache) e grava seus
+    artefatos numa subpasta com o nome da chave do backup. Gera um relatório por
+    arquivo, na ordem em que ficam prontos.
+    """
+    def gravar(nome, dados, origem_cache):
+        chave = chave_importacao(nome)
+        store.salvar(chave, dados)
+        detalhes = f"{len(dados['itens'])} itens" + (" (cache)" if origem_cache else "")
+        return {'arquivo': nome, 'ok': True, 'backup': chave, 'detalhes': detalhes}
+
+    def falha(nome, erro):
+        return {'arquivo': nome, 'ok': False, 'backup': '', 'detalhes': str(erro)}
+
+    def concluir(futuro):
+        nome, hash_pdf = futuros.pop(futuro)
+        try:
+            dados = futuro.result()
+            if cache:
+                cache.guardar(hash_pdf, dados)
+            return gravar(nome, dados, False)
+        except Exception as e:
+            return falha(nome, e)
+
+    # Cada arquivo é conferido no cache e enviado assim que chega a vez, com no máximo
+    # `limite` no pool: o processo principal não guarda o conteúdo dos PDFs, e os
+    # primeiros resultados saem antes de o último arquivo ser lido
+    limite = (processos or os.cpu_count() or 1) * PDFS_POR_PROCESSO
+    executor = None
+    futuros = {}
+    try:
+        for nome, origem in arquivos:
+            chave = chave_importacao(nome)
+            if not sobrescrever and os.path.exists(os.path.join(store.backup_dir, f"{chave}.json")):
+                yield {'arquivo': nome, 'ok': True, 'backup': chave, 'detalhes': JA_IMPORTADO}
+                continue
+            try:
+                hash_pdf = _hash_origem(origem)
+                # Com diagnóstico pedido, todo PDF é extraído de novo: um resultado do cache
+                # não tem os artefatos a gravar
+                dados = cache.obter(hash_pdf) if cache and not diagnostico_dir else None
+                if dados is not None:
+                    yield gravar(nome, dados, True)
+                    continue
+            except Exception as e:
+                yield falha(nome, e)
+                continue
+            if executor is None:
+                executor = ProcessPoolExecutor(max_workers=processos)
+            destino = os.path.join(diagnostico_dir, chave) if diagnostico_dir else None
+            futuros[executor.submit(_extrair_pdf, origem, destino)] = (nome, hash_pdf)
+            if len(futuros) >= limite:
+                prontos, _ = wait(futuros, return_when=FIRST_COMPLETED)
+                for futuro in prontos:
+                    yield concluir(futuro)
+        for futuro in as_completed(futuros):
+            yield concluir(futuro)
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
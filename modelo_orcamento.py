@@ -0,0 +1,86 @@
+class ItemOrcamento:
+    """Um item do orçamento. Converte de/para o dicionário usado nos backups e no PDF."""
+
+    __slots__ = ('nome', 'qtd', 'especificacoes', 'material', 'preco_unit', 'subtotal', 'foto')
+
+    def __init__(self, nome, qtd=1, especificacoes='', material='', preco_unit=0.0, subtotal=None, foto=None):
+        self.nome = nome
+        self.qtd = qtd
+        self.especificacoes = especificacoes
+        self.material = material
+        self.preco_unit = preco_unit
+        # Itens importados de PDF trazem o subtotal arredondado; os demais calculam
+        self.subtotal = qtd * preco_unit if subtotal is None else subtotal
+        # Nome do arquivo da foto de referência em backups/fotos/ (opcional)
+        self.foto = foto
+
+    @classmethod
+    def de_dict(cls, d):
+        return cls(d['Item'], d['Qtd'], d.get('Especificações', ''), d.get('Material', ''),
+                   d.get('Preço Unit', 0.0), d.get('Subtotal'), d.get('Foto'))
+
+    def para_dict(self):
+        d = {
+            'Item': self.nome,
+            'Qtd': self.qtd,
+            'Especificações': self.especificacoes,
+            'Material': self.material,
+            'Preço Unit': self.preco_unit,
+            'Subtotal': self.subtotal
+        }
+        if self.foto:
+            d['Foto'] = self.foto
+        return d
+
+
+class Orcamento:
+    """Itens do orçamento com o total atualizado a cada inclusão, edição ou remoção."""
+
+    __slots__ = ('_itens', 'total')
+
+    def __init__(self, itens=()):
+        self._itens = list(itens)
+        self.total = sum(item.subtotal for item in self._itens)
+
+    @classmethod
+    def de_dicts(cls, itens):
+        return cls(ItemOrcamento.de_dict(d) for d in itens)
+
+    @classmethod
+    def de(cls, itens):
+        """Aceita um Orcamento pronto ou a lista de dicionários dos backups."""
+        return itens if isinstance(itens, cls) else cls.de_dicts(itens or [])
+
+    def para_dicts(self):
+        return [item.para_dict() for item in self._itens]
+
+    def adicionar(self, item):
+        self._itens.append(item)
+        self.total += item.subtotal
+
+    def estender(self, itens):
+        itens = list(itens)
+        self._itens.extend(itens)
+        self.total += sum(item.subtotal for item in itens)
+
+    def substituir(self, indice, item):
+        self.total += item.subtotal - self._itens[indice].subtotal
+        self._itens[indice] = item
+
+    def remover(self, indice):
+        item = self._itens.pop(indice)
+        # Zera ao esvaziar para não acumular resíduo de ponto flutuante
+        self.total = self.total - item.subtotal if self._itens else 0.0
+        return item
+
+    def valor_final(self, desconto):
+        return self.total * (1 - desconto / 100)
+
+    def __len__(self):
+        return len(self._itens)
+
+    def __iter__(self):
+        return iter(self._itens)
+
+    def __getitem__(self, indice):
+        return self._itens[indice]
@@ -1,23 +1,25 @@
 import streamlit as st
-import pandas as pd
 import os
-import json
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Table, TableStyle, Spacer, Image
-from io import BytesIO
+import uuid
+import tempfile
+import functools
 from datetime import datetime
-import re
-
-# Usar pdfplumber em vez de PyPDF2 para extração mais confiável
-try:
-    import pdfplumber
-except ImportError:
-    pdfplumber = None
+from extracao_pdf import pdfplumber_disponivel, CacheExtracao, DIRETORIO_CACHE_EXTRACAO, DIAGNOSTICO_PADRAO
+from backup_store import BACKUP_DIR, BackupStore, AutoSalvamento
+from historico import HistoricoOrcamentos
+from imagens import CacheImagens, guardar_foto, caminho_foto
+from busca_clientes import IndiceClientes
+from catalogo import ArquivoCatalogo, interpretar_itens, CATALOGO_PADRAO
+from modelo_orcamento import ItemOrcamento, Orcamento
+from lote import importar_pdfs_em_lote, JA_IMPORTADO
+import instrumentacao
+from instrumentacao import etapa, MEDICAO_PADRAO, ARQUIVO_MEDICOES
+from pdf_orcamento import CachePDF, formatar_moeda, nome_arquivo_pdf, EMPRESA_NOME_PADRAO, EMPRESA_ENDERECO_PADRAO
 
 # Config da página
 st.set_page_config(page_title="Orçamentos Sob Medida", layout="wide")
+# Medição por etapa deste rerun (o toggle fica na barra lateral; desligada não custa nada)
+medicoes = instrumentacao.iniciar(st.session_state.get('medir_desempenho', MEDICAO_PADRAO))
 st.title("🛠️ Gerador de Orçamentos Sob Medida")
 
 # CSS customizado para os botões
@@ -55,219 +57,81 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # Diretório para backups
-BACKUP_DIR = "backups"
 if not os.path.exists(BACKUP_DIR):
     os.makedirs(BACKUP_DIR)
 
-def load_backups():
-    backups = {}
-    for filename in os.listdir(BACKUP_DIR):
-        if filename.endswith(".json"):
-            with open(os.path.join(BACKUP_DIR, filename), 'r', encoding='utf-8') as f:
-                try:
-                    backups[filename[:-5]] = json.load(f)
-                except Exception as e:
-                    print("Erro ao ler backup JSON:", filename, e)
-    return backups
-
-def save_backup(backup_key, backup_data):
-    with open(os.path.join(BACKUP_DIR, f"{backup_key}.json"), 'w', encoding='utf-8') as f:
-        json.dump(backup_data, f, ensure_ascii=False, indent=2)
-
-def extrair_dados_pdf(pdf_file):
-    """Extrai informações do PDF do orçamento usando pdfplumber."""
-    if pdfplumber is None:
+@st.cache_resource
+def obter_backup_store():
+    # Compartilhado entre sessões: o índice só relê arquivos alterados
+    return BackupStore(BACKUP_DIR)
+
+@st.cache_resource
+def obter_autosalvamento():
+    # Uma única thread de gravação por processo, compartilhada pelas sessões
+    return AutoSalvamento(obter_backup_store())
+
+@st.cache_resource
+def obter_historico():
+    return HistoricoOrcamentos(obter_backup_store(), BACKUP_DIR)
+
+@st.cache_resource
+def obter_indice_clientes():
+    # Montado uma vez por processo e atualizado só com os backups que mudaram
+    return IndiceClientes()
+
+@st.cache_resource
+def obter_cache_extracao():
+    # O mesmo PDF só é processado uma vez, mesmo com os reruns a cada interação
+    return CacheExtracao(diretorio=os.path.join(BACKUP_DIR, DIRETORIO_CACHE_EXTRACAO))
+
+@st.cache_resource
+def obter_catalogo():
+    # Lido uma vez por processo e relido só quando o arquivo do catálogo muda
+    return ArquivoCatalogo(CATALOGO_PADRAO)
+
+@st.cache_resource
+def obter_cache_imagens():
+    # Logo e fotos já reduzidos, usados no PDF e nas miniaturas da tela
+    return CacheImagens()
+
+@st.cache_resource
+def obter_cache_pdf():
+    # Estilos, logo e textos fixos do PDF são montados uma vez por processo, e um
+    # orçamento que não mudou não é renderizado de novo
+    return CachePDF(BACKUP_DIR, imagens=obter_cache_imagens())
+
+def extrair_dados_pdf(pdf_file, diagnostico_dir=None):
+    """Extrai informações do PDF do orçamento, mostrando o erro na tela se falhar."""
+    if not pdfplumber_disponivel():
         st.error("pdfplumber não está instalado. Instale com: pip install pdfplumber")
         return None
     try:
-        dados = {
-            'cliente_nome': '',
-            'cliente_telefone': '',
-            'cliente_endereco': '',
-            'projetos_nome': '',
-            'prazo': '',
-            'pagamento': '',
-            'orcamento_valido_por': '',
-            'observacao': '',
-            'itens_inclusos': '',
-            'itens_nao_inclusos': '',
-            'itens': []
-        }
-
-        with pdfplumber.open(pdf_file) as pdf:
-            texto_completo = ""
-            tabelas = []
-            for page in pdf.pages:
-                # Extrai texto bruto
-                texto = page.extract_text()
-                if texto:
-                    texto_completo += texto + "\n"
-                # Extrai tabelas da página
-                tabelas_pagina = page.extract_tables()
-                tabelas.extend(tabelas_pagina)
-
-            # DEBUG: gravar o texto extraído para análise
-            try:
-                with open("debug_texto_extraido.txt", "w", encoding="utf-8") as f:
-                    f.write(texto_completo)
-            except Exception as e:
-                print("Não foi possível gravar debug_texto_extraido.txt:", e)
-
-            # Para facilitar comparações
-            texto_lower = texto_completo.lower()
-
-            # Extração de dados gerais
-            match = re.search(r'cliente[:\s]+(.+?)(?:\n|telefone)', texto_lower, re.IGNORECASE)
-            if match:
-                dados['cliente_nome'] = match.group(1).strip().title()
-
-            match = re.search(r'telefone[:\s]+(.+?)(?:\n|endereço)', texto_lower, re.IGNORECASE)
-            if match:
-                dados['cliente_telefone'] = match.group(1).strip()
-
-            match = re.search(r'endereço[:\s]+(.+?)(?:\n{2,}|item)', texto_lower, re.IGNORECASE | re.DOTALL)
-            if match:
-                dados['cliente_endereco'] = match.group(1).strip().title()
-
-            match = re.search(r'prazo de entrega[:\s]+(.+?)(?:\n|forma)', texto_lower, re.IGNORECASE)
-            if match:
-                dados['prazo'] = match.group(1).strip().title()
-
-            match = re.search(r'forma de pagamento[:\s]+(.+?)(?:\n|orçamento)', texto_lower, re.IGNORECASE)
-            if match:
-                dados['pagamento'] = match.group(1).strip().title()
-
-            match = re.search(r'orçamento válido por[:\s]+(.+?)(?:\n|observações)', texto_lower, re.IGNORECASE)
-            if match:
-                dados['orcamento_valido_por'] = match.group(1).strip().title()
-
-            match = re.search(r'observações[:\s]+(.+?)(?:\n{2,}|itens inclusos)', texto_lower, re.IGNORECASE | re.DOTALL)
-            if match:
-                dados['observacao'] = match.group(1).strip().capitalize()
-
-            match = re.search(r'itens inclusos[:\s]+(.+?)(?:\n{2,}|itens não inclusos)', texto_lower, re.IGNORECASE | re.DOTALL)
-            if match:
-                dados['itens_inclusos'] = match.group(1).strip().capitalize()
-
-            match = re.search(r'itens não inclusos[:\s]+(.+?)(?:\n{2,}|móveis conforme|$)', texto_lower, re.IGNORECASE | re.DOTALL)
-            if match:
-                dados['itens_nao_inclusos'] = match.group(1).strip().capitalize()
-
-            match = re.search(r'projetos[:\s]+(.+)$', texto_lower, re.IGNORECASE)
-            if match:
-                dados['projetos_nome'] = match.group(1).strip().title()
-
-            # Extração de itens da tabela usando pdfplumber
-            for tabela in tabelas:
-                if not tabela or len(tabela) < 2:
-                    continue
-
-                cabecalho = [h.lower() if h else '' for h in tabela[0]]
-                idx_item = idx_qtd = idx_espec = idx_material = idx_subtotal = -1
-                for i, col in enumerate(cabecalho):
-                    if 'item' in col:
-                        idx_item = i
-                    elif 'qtd' in col or 'quantidade' in col:
-                        idx_qtd = i
-                    elif 'especificações' in col or 'especificacao' in col:
-                        idx_espec = i
-                    elif 'material' in col:
-                        idx_material = i
-                    elif 'subtotal' in col or 'valor' in col:
-                        idx_subtotal = i
-
-                for linha in tabela[1:]:
-                    if any(keyword in (''.join(linha).lower()) for keyword in ['total', 'condições', 'observações']):
-                        continue
-
-                    item_nome = ''
-                    qtd = 1
-                    especificacoes = ''
-                    material = ''
-                    subtotal = 0.0
-
-                    if idx_item != -1 and len(linha) > idx_item and linha[idx_item]:
-                        item_nome = linha[idx_item].strip()
-                    if idx_qtd != -1 and len(linha) > idx_qtd and linha[idx_qtd]:
-                        try:
-                            qtd = int(re.search(r'\d+', linha[idx_qtd]).group())
-                        except:
-                            qtd = 1
-                    if idx_espec != -1 and len(linha) > idx_espec and linha[idx_espec]:
-                        especificacoes = linha[idx_espec].strip()
-                    if idx_material != -1 and len(linha) > idx_material and linha[idx_material]:
-                        material = linha[idx_material].strip()
-                    if idx_subtotal != -1 and len(linha) > idx_subtotal and linha[idx_subtotal]:
-                        valor_str = re.search(r'[\d\.,]+', linha[idx_subtotal])
-                        if valor_str:
-                            subtotal_str = valor_str.group().replace('.', '').replace(',', '.')
-                            try:
-                                subtotal = float(subtotal_str)
-                            except:
-                                subtotal = 0.0
-
-                    preco_unit = subtotal / qtd if qtd > 0 and subtotal > 0 else subtotal
-
-                    if item_nome and subtotal > 0:
-                        dados['itens'].append({
-                            'Item': item_nome,
-                            'Qtd': qtd,
-                            'Especificações': especificacoes,
-                            'Material': material,
-                            'Preço Unit': round(preco_unit, 2),
-                            'Subtotal': round(subtotal, 2)
-                        })
-
-            if not dados['itens']:
-                linhas = texto_completo.splitlines()
-                capturando = False
-                for linha in linhas:
-                    low = linha.lower()
-                    if ('item' in low and 'qtd' in low and 'subtotal' in low) or ('item' in low and 'subtotal' in low):
-                        capturando = True
-                        continue
-                    if capturando:
-                        if 'total geral' in low or 'valor final' in low or 'condições' in low:
-                            break
-                        if re.search(r'r\$\s?\d', linha, re.IGNORECASE):
-                            subtimos = re.findall(r'R\$\s*([\d\.,]+)', linha)
-                            if not subtimos:
-                                continue
-                            subtotal_str = subtimos[-1].replace('.', '').replace(',', '.')
-                            try:
-                                subtotal = float(subtotal_str)
-                            except:
-                                continue
-                            partes = linha.split()
-                            qtd = 1
-                            nome_parts = []
-                            for p in partes:
-                                if re.fullmatch(r'\d+', p):
-                                    qtd = int(p)
-                                    continue
-                                if 'r$' in p.lower():
-                                    break
-                                nome_parts.append(p)
-                            nome_item = ' '.join(nome_parts).strip()
-                            if nome_item:
-                                preco_unit = subtotal / qtd if qtd > 0 else subtotal
-                                dados['itens'].append({
-                                    'Item': nome_item,
-                                    'Qtd': qtd,
-                                    'Especificações': '',
-                                    'Material': '',
-                                    'Preço Unit': round(preco_unit, 2),
-                                    'Subtotal': round(subtotal, 2)
-                                })
-
-        return dados
+        return obter_cache_extracao().extrair(pdf_file.getvalue(), diagnostico_dir)
     except Exception as e:
         st.error(f"Erro ao processar PDF: {str(e)}")
         return None
 
+def preencher_editor(item=None, qtd=True):
+    """Põe nos campos do editor os valores do item (ou os deixa vazios)."""
+    st.session_state.item_nome = item.nome if item else ""
+    if qtd:
+        st.session_state.item_qtd = item.qtd if item else 1
+    st.session_state.item_preco = float(item.preco_unit) if item else 0.0
+    st.session_state.item_especificacoes = item.especificacoes if item else ""
+    st.session_state.item_material = item.material if item else ""
+
+def limpar_editor():
+    """Sai da edição e esvazia o editor; os campos com chave (busca no catálogo, upload, lote) voltam vazios com a chave nova."""
+    st.session_state.itens_salvos = st.session_state.get('itens_salvos', 0) + 1
+    st.session_state.editing_index = None
+    st.session_state.pop('remover_foto', None)
+    st.session_state.pop('mensagem_editor', None)
+    st.session_state.pop('erro_editor', None)
+    preencher_editor()
+
 # Inicializa session_state
 if 'itens' not in st.session_state:
-    st.session_state.itens = []
+    st.session_state.itens = Orcamento()
 if 'cliente_nome' not in st.session_state:
     st.session_state.cliente_nome = ""
 if 'cliente_telefone' not in st.session_state:
@@ -278,12 +142,19 @@ if 'projetos_nome' not in st.session_state:
     st.session_state.projetos_nome = ""
 if 'editing_index' not in st.session_state:
     st.session_state.editing_index = None
-st.session_state.backups = load_backups()
+if 'autosave_key' not in st.session_state:
+    # Cada sessão de edição vira um backup próprio, atualizado automaticamente
+    st.session_state.autosave_key = f"orcamento_{datetime.now().strftime('%Y%m%d-%H%M%S')}_{uuid.uuid4().hex[:6]}"
+backup_store = obter_backup_store()
+backup_store.sincronizar()
+indice_clientes = obter_indice_clientes()
+indice_clientes.sincronizar(backup_store)
+historico = obter_historico()
 
 # Sidebar para dados da empresa / cliente
 st.sidebar.header("Dados da Empresa (Edite uma vez)")
-empresa_nome = st.sidebar.text_input("Nome da Marcenaria", value="AW Marcenaria Móveis Sob Medida")
-empresa_endereco = st.sidebar.text_input("Endereço da Empresa", value="Rua Brusque, 880, Bairro Glória - Blumenau - SC")
+empresa_nome = st.sidebar.text_input("Nome da Marcenaria", value=EMPRESA_NOME_PADRAO)
+empresa_endereco = st.sidebar.text_input("Endereço da Empresa", value=EMPRESA_ENDERECO_PADRAO)
 
 st.sidebar.header("Dados do Cliente")
 cliente_nome = st.sidebar.text_input("Nome do Cliente", value=st.session_state.cliente_nome, key="cliente_input")
@@ -291,15 +162,25 @@ cliente_telefone = st.sidebar.text_input("Telefone do Cliente", value=st.session
 cliente_endereco = st.sidebar.text_area("Endereço do Cliente", value=st.session_state.cliente_endereco, key="endereco_input")
 projetos_nome = st.sidebar.text_input("Nome do Projeto (opcional)", value=st.session_state.projetos_nome, key="projetos_input")
 
+# Modo diagnóstico: artefatos de cada importação numa pasta temporária desta sessão
+diagnostico_dir = None
+if st.sidebar.toggle("🩺 Modo diagnóstico", value=DIAGNOSTICO_PADRAO, help="Grava texto extraído, tabelas detectadas e tempos por página de cada PDF importado"):
+    if 'diagnostico_dir' not in st.session_state:
+        st.session_state.diagnostico_dir = tempfile.mkdtemp(prefix="orcamento_diagnostico_")
+    diagnostico_dir = st.session_state.diagnostico_dir
+    st.sidebar.caption(f"Artefatos em `{diagnostico_dir}`")
+st.sidebar.toggle("⏱️ Medir desempenho", value=MEDICAO_PADRAO, key="medir_desempenho",
+                  help="Mostra no fim da barra lateral o tempo de cada etapa deste rerun")
+
 # Importar PDF
 st.subheader("📄 Importar Orçamento de PDF")
 st.info("💡 Carregue um PDF de orçamento anterior para editar. O sistema vai extrair automaticamente os dados!")
-if pdfplumber is None:
+if not pdfplumber_disponivel():
     st.warning("⚠️ Para usar esta função, é necessário instalar pdfplumber. Execute: pip install pdfplumber")
 uploaded_pdf = st.file_uploader("Escolha um arquivo PDF de orçamento", type="pdf", key="pdf_uploader")
 if uploaded_pdf is not None:
     with st.spinner("Extraindo dados do PDF..."):
-        dados_extraidos = extrair_dados_pdf(uploaded_pdf)
+        dados_extraidos = extrair_dados_pdf(uploaded_pdf, diagnostico_dir)
     if dados_extraidos:
         st.success("✅ PDF processado com sucesso!")
         with st.expander("📋 Visualizar dados extraídos", expanded=True):
@@ -317,281 +198,390 @@ if uploaded_pdf is not None:
             st.session_state.cliente_telefone = dados_extraidos['cliente_telefone']
             st.session_state.cliente_endereco = dados_extraidos['cliente_endereco']
             st.session_state.projetos_nome = dados_extraidos['projetos_nome']
-            st.session_state.itens = dados_extraidos['itens'].copy()
+            st.session_state.itens = Orcamento.de_dicts(dados_extraidos['itens'])
             st.session_state.prazo_temp = dados_extraidos['prazo']
             st.session_state.pagamento_temp = dados_extraidos['pagamento']
             st.session_state.orcamento_valido_por_temp = dados_extraidos['orcamento_valido_por']
             st.session_state.observacao_temp = dados_extraidos['observacao']
             st.session_state.itens_inclusos_temp = dados_extraidos['itens_inclusos']
             st.session_state.itens_nao_inclusos_temp = dados_extraidos['itens_nao_inclusos']
+            st.session_state.data_orcamento = dados_extraidos.get('data_orcamento', '')
+            # O item em edição era do orçamento anterior
+            limpar_editor()
             st.success("🎉 Dados carregados! Agora você pode editar o que precisar.")
             st.rerun()
 
+# Importação em lote: cada PDF é processado em paralelo e gravado nos backups assim que termina
+with st.expander("📦 Importar vários PDFs para os backups"):
+    arquivos_lote = st.file_uploader("Escolha os PDFs de orçamento", type="pdf", accept_multiple_files=True, key="pdf_lote_uploader")
+    sobrescrever = st.checkbox("Importar de novo os PDFs que já têm backup (apaga as edições feitas neles)",
+                               key="pdf_lote_sobrescrever")
+    if arquivos_lote and st.button("📥 Importar todos", use_container_width=True):
+        arquivos = [(arquivo.name, arquivo.getvalue()) for arquivo in arquivos_lote]
+        progresso = st.progress(0.0)
+        relatorio = []
+        for resultado in importar_pdfs_em_lote(arquivos, backup_store, cache=obter_cache_extracao(),
+                                               diagnostico_dir=diagnostico_dir, sobrescrever=sobrescrever):
+            relatorio.append(resultado)
+            progresso.progress(len(relatorio) / len(arquivos), text=f"{len(relatorio)} de {len(arquivos)}: {resultado['arquivo']}")
+        pulados = sum(1 for r in relatorio if r['detalhes'] == JA_IMPORTADO)
+        importados = sum(1 for r in relatorio if r['ok']) - pulados
+        if importados + pulados == len(arquivos):
+            st.success(f"✅ {importados} PDFs importados.")
+        else:
+            st.warning(f"⚠️ {importados} de {len(arquivos)} PDFs importados.")
+        if pulados:
+            st.info(f"{pulados} PDFs já tinham backup e foram pulados.")
+        with etapa("tela.relatorio_importacao"):
+            st.dataframe(relatorio, use_container_width=True)
+
 # Restaurar orçamento via backup
+def carregar_orcamento_na_sessao(backup_key, backup_data):
+    # A sessão passa a continuar o backup restaurado: o salvamento automático e as
+    # versões dos próximos PDFs vão para ele, e não para um backup novo
+    st.session_state.autosave_key = backup_key
+    st.session_state.itens = Orcamento.de_dicts(backup_data['itens'])
+    st.session_state.cliente_nome = backup_data['cliente_nome']
+    st.session_state.cliente_telefone = backup_data['cliente_telefone']
+    st.session_state.cliente_endereco = backup_data['cliente_endereco']
+    st.session_state.projetos_nome = backup_data.get('projetos_nome', '')
+    st.session_state.desconto_temp = backup_data.get('desconto', 0.0)
+    st.session_state.prazo_temp = backup_data.get('prazo', '')
+    st.session_state.pagamento_temp = backup_data.get('pagamento', '')
+    st.session_state.orcamento_valido_por_temp = backup_data.get('orcamento_valido_por', '')
+    st.session_state.observacao_temp = backup_data.get('observacao', '')
+    st.session_state.itens_inclusos_temp = backup_data.get('itens_inclusos', '')
+    st.session_state.itens_nao_inclusos_temp = backup_data.get('itens_nao_inclusos', '')
+    st.session_state.data_orcamento = backup_data.get('data_orcamento', '')
+    # O item em edição era do orçamento anterior
+    limpar_editor()
+
 st.subheader("Restaurar Orçamento")
-if cliente_nome and st.session_state.backups:
-    cliente_backups = {k: v for k, v in st.session_state.backups.items() if v.get('cliente_nome') == cliente_nome}
-    if cliente_backups:
-        backup_options = list(cliente_backups.keys())
-        selected_backup = st.selectbox("Selecione o backup:", backup_options)
-        if st.button("Restaurar Orçamento Selecionado", key="restore"):
-            backup_data = cliente_backups[selected_backup]
-            st.session_state.itens = backup_data['itens'].copy()
-            st.session_state.cliente_nome = backup_data['cliente_nome']
-            st.session_state.cliente_telefone = backup_data['cliente_telefone']
-            st.session_state.cliente_endereco = backup_data['cliente_endereco']
-            st.session_state.projetos_nome = backup_data.get('projetos_nome', '')
-            st.session_state.orcamento_valido_por = backup_data.get('orcamento_valido_por', '')
+busca = st.text_input("🔎 Buscar por cliente, telefone, endereço ou projeto", value=cliente_nome)
+# Sem busca, ficam à mão os rascunhos mais recentes, salvos antes de o cliente ter nome
+backup_options = indice_clientes.buscar(busca) if busca else indice_clientes.rascunhos()
+if backup_options:
+    def rotulo_backup(chave):
+        nome, telefone, _, projeto = indice_clientes.campos.get(chave, ('', '', '', ''))
+        detalhes = " · ".join(c for c in (nome, telefone, projeto) if c)
+        return f"{chave} — {detalhes}" if detalhes else chave
+    selected_backup = st.selectbox("Selecione o backup:" if busca else "Rascunhos recentes (sem cliente):",
+                                   backup_options, format_func=rotulo_backup)
+    if st.button("Restaurar Orçamento Selecionado", key="restore"):
+        backup_data = backup_store.carregar(selected_backup)
+        if backup_data:
+            carregar_orcamento_na_sessao(selected_backup, backup_data)
             st.rerun()
-    else:
-        st.write(f"Nenhum backup encontrado para {cliente_nome}.")
-elif cliente_nome:
-    st.write(f"Nenhum backup encontrado para {cliente_nome}.")
+        else:
+            st.error("Não foi possível ler o backup selecionado.")
+
+    # Versões gravadas a cada PDF gerado
+    versoes = historico.versoes(selected_backup)
+    if versoes:
+        with st.expander(f"🕘 Histórico de versões ({len(versoes)})"):
+            rotulos = {numero: f"Versão {numero} — {em.replace('T', ' ')}" for numero, em in versoes}
+            versao = st.selectbox("Versão:", list(reversed(rotulos)), format_func=rotulos.get)
+            if st.button("Restaurar esta versão", key="restore_versao"):
+                # A versão antiga volta a ser o backup e entra no histórico como a mais nova
+                carregar_orcamento_na_sessao(selected_backup, historico.restaurar(selected_backup, versao))
+                st.rerun()
+            numeros = [numero for numero, _ in versoes]
+            if numeros.index(versao) > 0:
+                anterior = numeros[numeros.index(versao) - 1]
+                diferencas = historico.comparar(selected_backup, anterior, versao)
+                st.write(f"**Mudanças desde a versão {anterior}:**")
+                for campo, (antes, depois) in diferencas['campos'].items():
+                    st.write(f"- {campo}: {antes or '—'} → {depois or '—'}")
+                for item in diferencas['itens_adicionados']:
+                    st.write(f"- ➕ {item['Item']} ({formatar_moeda(item['Subtotal'])})")
+                for item in diferencas['itens_removidos']:
+                    st.write(f"- ➖ {item['Item']} ({formatar_moeda(item['Subtotal'])})")
+                for antes, depois in diferencas['itens_alterados']:
+                    st.write(f"- ✏️ {antes['Item']}: {formatar_moeda(antes['Subtotal'])} → {formatar_moeda(depois['Subtotal'])}")
+elif busca:
+    st.write(f"Nenhum backup encontrado para \"{busca}\".")
 
 # Interface principal: adicionar/editar itens
-st.header("Adicionar/Editar Itens Sob Medida")
-editing_item = None
-if st.session_state.editing_index is not None:
-    editing_item = st.session_state.itens[st.session_state.editing_index]
-
-col1, col2, col3 = st.columns(3)
-with col1:
-    item_nome = st.text_input("Nome do Item", value=editing_item['Item'] if editing_item else "")
-with col2:
-    qtd = st.number_input("Quantidade", min_value=1, value=editing_item['Qtd'] if editing_item else 1)
-with col3:
-    preco_unit = st.number_input("Preço Unitário (R$)", min_value=0.0, value=editing_item['Preço Unit'] if editing_item else 0.0)
-
-especificacoes = st.text_area("Especificações", value=editing_item['Especificações'] if editing_item else "", height=100)
-material = st.text_input("Material", value=editing_item['Material'] if editing_item else "")
-
-col_btn1, col_btn2 = st.columns([3, 1])
-with col_btn1:
-    button_label = "✏️ Atualizar Item" if editing_item else "➕ Adicionar Item"
-    if st.button(button_label, use_container_width=True):
-        if item_nome and preco_unit > 0:
-            novo_item = {
-                'Item': item_nome,
-                'Qtd': qtd,
-                'Especificações': especificacoes,
-                'Material': material,
-                'Preço Unit': preco_unit,
-                'Subtotal': qtd * preco_unit
-            }
-            if editing_item:
-                st.session_state.itens[st.session_state.editing_index] = novo_item
-                st.session_state.editing_index = None
-                st.success("Item atualizado!")
-            else:
-                st.session_state.itens.append(novo_item)
-                st.success("Item adicionado!")
-            st.rerun()
-        else:
-            st.error("Preencha nome e preço!")
-with col_btn2:
-    if editing_item:
-        if st.button("❌ Cancelar", use_container_width=True):
-            st.session_state.editing_index = None
-            st.rerun()
+# Editor, lista e totais são fragmentos: digitar ou clicar num deles só reexecuta aquele
+# trecho, e os botões que mudam os itens reexecutam só os fragmentos afetados (e não o
+# script inteiro, com a barra lateral, a importação de PDF e a leitura dos backups)
+FRAGMENTOS_ITENS = ["editor_itens", "lista_itens", "totais"]
+# Medições dos fragmentos reexecutados sozinhos guardadas para o painel da barra lateral
+MEDICOES_FRAGMENTOS_NO_PAINEL = 10
+
+def medir_fragmento(funcao):
+    """Dá medições próprias ao fragmento quando ele roda sem o script (o `iniciar` do topo não roda)."""
+    @functools.wraps(funcao)
+    def fragmento():
+        # Num rerun completo, o tempo do fragmento entra nas medições do script
+        if instrumentacao.atuais() is not None or not st.session_state.get('medir_desempenho', MEDICAO_PADRAO):
+            return funcao()
+        medicoes_fragmento = instrumentacao.iniciar()
+        try:
+            return funcao()
+        finally:
+            instrumentacao.iniciar(False)
+            registro = medicoes_fragmento.para_dict(fragmento=funcao.__name__)
+            recentes = st.session_state.setdefault('medicoes_fragmentos', [])
+            recentes[:] = (recentes + [registro])[-MEDICOES_FRAGMENTOS_NO_PAINEL:]
+            if st.session_state.get('exportar_medicoes'):
+                instrumentacao.exportar_jsonl(medicoes_fragmento, os.path.join(BACKUP_DIR, ARQUIVO_MEDICOES),
+                                              sessao=st.session_state.autosave_key, fragmento=funcao.__name__)
+    return fragmento
+
+def item_salvo(mensagem):
+    limpar_editor()
+    st.session_state.mensagem_editor = mensagem
+    st.rerun(FRAGMENTOS_ITENS)
+
+def salvar_item():
+    nome, preco_unit = st.session_state.item_nome, st.session_state.item_preco
+    if not (nome and preco_unit > 0):
+        st.session_state.mensagem_editor = None
+        st.session_state.erro_editor = "Preencha nome e preço!"
+        return
+    editando = st.session_state.editing_index
+    foto_enviada = st.session_state.get(f"foto_item_{st.session_state.get('itens_salvos', 0)}")
+    foto = st.session_state.itens[editando].foto if editando is not None and not st.session_state.get('remover_foto') else None
+    if foto_enviada:
+        foto = guardar_foto(foto_enviada.getvalue(), BACKUP_DIR, os.path.splitext(foto_enviada.name)[1])
+    novo_item = ItemOrcamento(nome, st.session_state.item_qtd, st.session_state.item_especificacoes,
+                              st.session_state.item_material, preco_unit, foto=foto)
+    if editando is not None:
+        st.session_state.itens.substituir(editando, novo_item)
+        item_salvo("Item atualizado!")
+    else:
+        st.session_state.itens.adicionar(novo_item)
+        item_salvo("Item adicionado!")
+
+def adicionar_lote(itens_lote):
+    # Todos os itens entram juntos, com uma única reexecução
+    st.session_state.itens.estender(itens_lote)
+    item_salvo(f"{len(itens_lote)} itens adicionados!")
 
-if st.session_state.itens:
-    df = pd.DataFrame(st.session_state.itens)
+def usar_item_do_catalogo(chave):
+    if st.session_state.get(chave) is not None:
+        preencher_editor(st.session_state[chave], qtd=False)
+
+def editar_item(index):
+    st.session_state.editing_index = index
+    preencher_editor(st.session_state.itens[index])
+    st.rerun(["editor_itens", "lista_itens"])
+
+def cancelar_edicao():
+    st.session_state.editing_index = None
+    preencher_editor()
+    st.rerun(["editor_itens", "lista_itens"])
+
+def remover_item(index):
+    st.session_state.itens.remover(index)
+    if st.session_state.editing_index == index:
+        st.session_state.editing_index = None
+        preencher_editor()
+    elif st.session_state.editing_index is not None and st.session_state.editing_index > index:
+        st.session_state.editing_index -= 1
+    st.rerun(FRAGMENTOS_ITENS)
+
+if 'item_nome' not in st.session_state:
+    preencher_editor()
+# Um orçamento restaurado ou importado pode ter menos itens que o índice em edição
+if st.session_state.editing_index is not None and st.session_state.editing_index >= len(st.session_state.itens):
+    st.session_state.editing_index = None
+
+@st.fragment(key="editor_itens")
+@medir_fragmento
+def editor_itens():
+    st.header("Adicionar/Editar Itens Sob Medida")
+    editing_item = None
+    if st.session_state.editing_index is not None:
+        editing_item = st.session_state.itens[st.session_state.editing_index]
+    itens_salvos = st.session_state.get('itens_salvos', 0)
+
+    catalogo = obter_catalogo().atual()
+    if obter_catalogo().erro:
+        st.warning(f"Não foi possível ler o catálogo: {obter_catalogo().erro}")
+    elif catalogo and not editing_item:
+        busca_catalogo = st.text_input(f"📚 Buscar no catálogo ({len(catalogo)} itens) por nome ou material",
+                                       key=f"busca_catalogo_{itens_salvos}")
+        if busca_catalogo:
+            sugestoes = catalogo.buscar(busca_catalogo)
+            if sugestoes:
+                # Escolher um item do catálogo preenche os campos abaixo
+                chave = f"item_catalogo_{itens_salvos}"
+                st.selectbox("Item do catálogo", sugestoes, index=None, placeholder="Escolha um item", key=chave,
+                             format_func=lambda i: f"{i.nome} — {i.material} — {formatar_moeda(i.preco_unit)}",
+                             on_change=usar_item_do_catalogo, args=(chave,))
+            else:
+                st.caption(f"Nada no catálogo para \"{busca_catalogo}\".")
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.text_input("Nome do Item", key="item_nome")
+    with col2:
+        st.number_input("Quantidade", min_value=1, key="item_qtd")
+    with col3:
+        st.number_input("Preço Unitário (R$)", min_value=0.0, key="item_preco")
+
+    st.text_area("Especificações", height=100, key="item_especificacoes")
+    st.text_input("Material", key="item_material")
+    st.file_uploader("Foto de referência (opcional, sai em miniatura no PDF)", type=["jpg", "jpeg", "png", "webp"],
+                     key=f"foto_item_{itens_salvos}")
+    if editing_item and editing_item.foto:
+        st.checkbox("Remover a foto atual", key="remover_foto")
+
+    col_btn1, col_btn2 = st.columns([3, 1])
+    with col_btn1:
+        button_label = "✏️ Atualizar Item" if editing_item else "➕ Adicionar Item"
+        st.button(button_label, use_container_width=True, on_click=salvar_item)
+    with col_btn2:
+        if editing_item:
+            st.button("❌ Cancelar", use_container_width=True, on_click=cancelar_edicao)
+    if st.session_state.get('erro_editor'):
+        st.error(st.session_state.pop('erro_editor'))
+    if st.session_state.get('mensagem_editor'):
+        st.success(st.session_state.pop('mensagem_editor'))
+
+    if not editing_item:
+        with st.expander("📋 Adicionar vários itens de uma vez"):
+            st.caption("Cole as linhas de uma planilha (Item, Qtd, Preço Unit, Material, Especificações) ou envie um CSV "
+                       "com cabeçalho. Linhas sem preço usam o preço do catálogo.")
+            texto_lote = st.text_area("Tabela de itens", height=150, key=f"lote_texto_{itens_salvos}")
+            arquivo_lote = st.file_uploader("Ou um arquivo CSV", type=["csv", "tsv", "txt"], key=f"lote_arquivo_{itens_salvos}")
+            if arquivo_lote:
+                texto_lote = arquivo_lote.getvalue().decode('utf-8-sig', errors='replace')
+            if texto_lote.strip():
+                itens_lote, erros_lote = interpretar_itens(texto_lote, catalogo)
+                for numero, conteudo, motivo in erros_lote[:20]:
+                    st.warning(f"Linha {numero} ignorada ({motivo}): {conteudo}")
+                if len(erros_lote) > 20:
+                    st.warning(f"... e mais {len(erros_lote) - 20} linhas com erro.")
+                if itens_lote:
+                    st.dataframe([item.para_dict() for item in itens_lote], hide_index=True, use_container_width=True)
+                    st.button(f"➕ Adicionar {len(itens_lote)} itens", use_container_width=True,
+                              on_click=adicionar_lote, args=(itens_lote,))
+
+@st.fragment(key="lista_itens")
+@medir_fragmento
+def lista_itens():
+    if not st.session_state.itens:
+        return
     st.subheader("Resumo dos Itens")
-    for index, row in df.iterrows():
-        with st.expander(f"{row['Item']} - Qtd: {row['Qtd']}", expanded=(index == st.session_state.editing_index)):
-            st.write(f"**Material:** {row['Material']}")
-            st.write(f"**Especificações:** {row['Especificações']}")
-            st.write(f"**Subtotal:** R$ {row['Subtotal']:,.2f}".replace('.', '#').replace(',', '.').replace('#', ','))
-            col_a, col_b = st.columns(2)
-            with col_a:
-                if st.button("✏️ Editar", key=f"editar_{index}", use_container_width=True):
-                    st.session_state.editing_index = index
-                    st.rerun()
-            with col_b:
-                if st.button("❌ Remover", key=f"remover_{index}", use_container_width=True):
-                    st.session_state.itens.pop(index)
-                    if st.session_state.editing_index == index:
-                        st.session_state.editing_index = None
-                    st.rerun()
-
-    total = df['Subtotal'].sum()
-    col_a, col_b = st.columns(2)
-    with col_a:
-        desconto = st.number_input("Desconto %", min_value=0.0, max_value=100.0, value=0.0)
-    with col_b:
-        valor_final = total * (1 - desconto / 100)
-    if desconto > 0:
-        st.subheader(f"Total Geral: R$ {total:,.2f}".replace('.', '#').replace(',', '.').replace('#', ','))
-        st.subheader(f"Valor Final: R$ {valor_final:,.2f}".replace('.', '#').replace(',', '.').replace('#', ','))
-    else:
-        st.subheader(f"Valor Final: R$ {valor_final:,.2f}".replace('.', '#').replace(',', '.').replace('#', ','))
-
-st.subheader("Condições")
-col_c, col_d, col_e = st.columns(3)
-with col_c:
-    prazo = st.text_input("Prazo de entrega", value=st.session_state.get('prazo_temp', ''))
-with col_d:
-    pagamento = st.text_input("Forma de pagamento", value=st.session_state.get('pagamento_temp', ''))
-with col_e:
-    orcamento_valido_por = st.text_input("Orçamento válido por", value=st.session_state.get('orcamento_valido_por_temp', ''))
-
-observacao = st.text_area("Observações", height=100, help="Ex: Entrega inclui instalação", value=st.session_state.get('observacao_temp', ''))
-itens_inclusos = st.text_area("Itens Inclusos", height=100, help="Ex: Manutenção básica", value=st.session_state.get('itens_inclusos_temp', ''))
-itens_nao_inclusos = st.text_area("Itens Não Inclusos", height=100, help="Ex: Transporte", value=st.session_state.get('itens_nao_inclusos_temp', ''))
-
-if st.button("📄 Gerar e Baixar PDF", use_container_width=True):
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter, topMargin=36)
-    styles = getSampleStyleSheet()
-    elements = []
-
-    # Cabeçalho
-    logo_path = os.path.join(os.path.dirname(__file__), "Logo.jpg")
-    if not os.path.exists(logo_path):
-        logo_path = os.path.join(BACKUP_DIR, "Logo.jpg")
-    header_data = [[Paragraph(f"<b>{empresa_nome}</b>", styles['Heading1']), ""]]
-    if os.path.exists(logo_path):
-        logo = Image(logo_path, width=1*inch, height=1*inch)
-        header_data[0][1] = logo
-    header_table = Table(header_data, colWidths=[5.5*inch, 0.5*inch])
-    header_table.setStyle(TableStyle([
-        ('ALIGN', (0, 0), (0, 0), 'LEFT'),
-        ('ALIGN', (1, 0), (1, 0), 'RIGHT'),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('LEFTPADDING', (0, 0), (-1, -1), 0),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 0),
-        ('TOPPADDING', (0, 0), (-1, -1), 2),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 0),
-    ]))
-    elements.append(header_table)
-    elements.append(Paragraph(f"{empresa_endereco}", styles['Normal']))
-    elements.append(Paragraph(f"Data: {datetime.now().strftime('%d/%m/%Y')}", styles['Normal']))
-    elements.append(Spacer(1, 12))
-
-    # Dados do cliente
-    elements.append(Paragraph("<b>Orçamento</b>", styles['Heading2']))
-    elements.append(Paragraph(f"Cliente: {cliente_nome or 'Não especificado'}", styles['Normal']))
-    elements.append(Paragraph(f"Telefone: {cliente_telefone or 'Não especificado'}", styles['Normal']))
-    elements.append(Paragraph(f"Endereço: {cliente_endereco or 'Não especificado'}", styles['Normal']))
-    elements.append(Spacer(1, 12))
-
-    # Tabela de itens
+    with etapa("tela.lista_itens"):
+        for index, item in enumerate(st.session_state.itens):
+            with st.expander(f"{item.nome} - Qtd: {item.qtd}", expanded=(index == st.session_state.editing_index)):
+                st.write(f"**Material:** {item.material}")
+                st.write(f"**Especificações:** {item.especificacoes}")
+                st.write(f"**Subtotal:** {formatar_moeda(item.subtotal)}")
+                if item.foto:
+                    miniatura = obter_cache_imagens().obter(caminho_foto(BACKUP_DIR, item.foto), 120, 120)
+                    if miniatura:
+                        st.image(miniatura[0], width=120)
+                col_a, col_b = st.columns(2)
+                with col_a:
+                    st.button("✏️ Editar", key=f"editar_{index}", use_container_width=True,
+                              on_click=editar_item, args=(index,))
+                with col_b:
+                    st.button("❌ Remover", key=f"remover_{index}", use_container_width=True,
+                              on_click=remover_item, args=(index,))
+
+@st.fragment(key="totais")
+@medir_fragmento
+def totais():
+    # Totais, condições, salvamento automático e PDF dependem dos itens e reexecutam juntos
+    desconto = 0.0
     if st.session_state.itens:
-        df = pd.DataFrame(st.session_state.itens)
-        table_data = [["Item", "Qtd", "Especificações", "Material", "Subtotal"]]
-        for _, row in df.iterrows():
-            espec_lines = row['Especificações'].split('\n')
-            full_spec = "<br/>".join(espec_lines)
-            table_data.append([
-                Paragraph(row['Item'], styles['Normal']),
-                str(row['Qtd']),
-                Paragraph(full_spec, styles['Normal']),
-                row['Material'][:15],
-                f"R$ {row['Subtotal']:,.2f}".replace('.', '#').replace(',', '.').replace('#', ',')
-            ])
-        table = Table(table_data, colWidths=[1.5*inch, 0.5*inch, 3*inch, 1.5*inch, 1*inch])
-        style = TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), '#D3D3D3'),
-            ('TEXTCOLOR', (0, 0), (-1, 0), '#000000'),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('GRID', (0, 0), (-1, -1), 1, '#000000'),
-            ('LEFTPADDING', (0, 0), (-1, -1), 5),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 5),
-            ('TOPPADDING', (0, 0), (-1, -1), 5),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
-        ])
-        table.setStyle(style)
-        elements.append(table)
-
-    # Totais
-    elements.append(Spacer(1, 12))
-    total = df['Subtotal'].sum() if st.session_state.itens else 0
-    valor_final = total * (1 - desconto / 100)
-    if desconto > 0:
-        elements.append(Paragraph(f"<b>Total Geral: R$ {total:,.2f}</b>".replace('.', '#').replace(',', '.').replace('#', ','), styles['Heading2']))
-        elements.append(Paragraph(f"<b>Valor Final: R$ {valor_final:,.2f}</b>".replace('.', '#').replace(',', '.').replace('#', ','), styles['Heading2']))
-    else:
-        elements.append(Paragraph(f"<b>Valor Final: R$ {valor_final:,.2f}</b>".replace('.', '#').replace(',', '.').replace('#', ','), styles['Heading2']))
-
-    # Condições
-    elements.append(Spacer(1, 24))
-    elements.append(Paragraph("<b>Condições:</b>", styles['Heading2']))
-    elements.append(Paragraph(f"Prazo de entrega: {prazo}", styles['Normal']))
-    elements.append(Paragraph(f"Forma de pagamento: {pagamento}", styles['Normal']))
-    elements.append(Paragraph(f"Orçamento válido por: {orcamento_valido_por}", styles['Normal']))
-
-    # Observações
-    if observacao:
-        elements.append(Spacer(1, 12))
-        observacao_table = Table([[Paragraph(f"<b>Observações:</b><br/>{observacao}", styles['Normal'])]], colWidths=[6*inch])
-        observacao_style = TableStyle([
-            ('BACKGROUND', (0, 0), (-1, -1), '#F0F0F0'),
-            ('GRID', (0, 0), (-1, -1), 1, '#000000'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('LEFTPADDING', (0, 0), (-1, -1), 10),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 10),
-            ('TOPPADDING', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
-        ])
-        observacao_table.setStyle(observacao_style)
-        elements.append(observacao_table)
-        elements.append(Spacer(1, 12))
-
-    # Itens inclusos
-    if itens_inclusos:
-        elements.append(Spacer(1, 12))
-        inclusos_table = Table([[Paragraph(f"<b>Itens Inclusos:</b><br/>{itens_inclusos}", styles['Normal'])]], colWidths=[6*inch])
-        inclusos_style = TableStyle([
-            ('BACKGROUND', (0, 0), (-1, -1), '#F0F0F0'),
-            ('GRID', (0, 0), (-1, -1), 1, '#000000'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('LEFTPADDING', (0, 0), (-1, -1), 10),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 10),
-            ('TOPPADDING', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
-        ])
-        inclusos_table.setStyle(inclusos_style)
-        elements.append(inclusos_table)
-        elements.append(Spacer(1, 12))
-
-    # Itens não inclusos
-    if itens_nao_inclusos:
-        elements.append(Spacer(1, 12))
-        nao_inclusos_table = Table([[Paragraph(f"<b>Itens Não Inclusos:</b><br/>{itens_nao_inclusos}", styles['Normal'])]], colWidths=[6*inch])
-        nao_inclusos_style = TableStyle([
-            ('BACKGROUND', (0, 0), (-1, -1), '#F0F0F0'),
-            ('GRID', (0, 0), (-1, -1), 1, '#000000'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('LEFTPADDING', (0, 0), (-1, -1), 10),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 10),
-            ('TOPPADDING', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
-        ])
-        nao_inclusos_table.setStyle(nao_inclusos_style)
-        elements.append(nao_inclusos_table)
-        elements.append(Spacer(1, 12))
-
-    # Texto final
-    elements.append(Paragraph("Móveis conforme projetos com garantia de dois anos.", styles['Normal']))
-    elements.append(Spacer(1, 12))
-    elements.append(Paragraph("<u>Att. Genesio e Sidnei</u>", styles['Normal']))
-    if projetos_nome:
-        elements.append(Paragraph(f"Projetos: {projetos_nome}", styles['Normal']))
-
-    doc.build(elements)
-    buffer.seek(0)
-    nome_arquivo = f"orcamento_{cliente_nome.replace(' ', '_')}_{datetime.now().strftime('%d-%m-%Y')}.pdf" if cliente_nome else f"orcamento_{datetime.now().strftime('%d-%m-%Y')}.pdf"
-    st.download_button(
-        label="📄 Baixar Orçamento em PDF",
-        data=buffer,
-        file_name=nome_arquivo,
-        mime="application/pdf",
-        use_container_width=True
-    )
+        total = st.session_state.itens.total
+        col_a, col_b = st.columns(2)
+        with col_a:
+            desconto = st.number_input("Desconto %", min_value=0.0, max_value=100.0, value=float(st.session_state.get('desconto_temp', 0.0)))
+        with col_b:
+            valor_final = st.session_state.itens.valor_final(desconto)
+        if desconto > 0:
+            st.subheader(f"Total Geral: {formatar_moeda(total)}")
+        st.subheader(f"Valor Final: {formatar_moeda(valor_final)}")
+
+    st.subheader("Condições")
+    col_c, col_d, col_e = st.columns(3)
+    with col_c:
+        prazo = st.text_input("Prazo de entrega", value=st.session_state.get('prazo_temp', ''))
+    with col_d:
+        pagamento = st.text_input("Forma de pagamento", value=st.session_state.get('pagamento_temp', ''))
+    with col_e:
+        orcamento_valido_por = st.text_input("Orçamento válido por", value=st.session_state.get('orcamento_valido_por_temp', ''))
+
+    observacao = st.text_area("Observações", height=100, help="Ex: Entrega inclui instalação", value=st.session_state.get('observacao_temp', ''))
+    itens_inclusos = st.text_area("Itens Inclusos", height=100, help="Ex: Manutenção básica", value=st.session_state.get('itens_inclusos_temp', ''))
+    itens_nao_inclusos = st.text_area("Itens Não Inclusos", height=100, help="Ex: Transporte", value=st.session_state.get('itens_nao_inclusos_temp', ''))
+
+    dados_orcamento = {
+        'empresa_nome': empresa_nome,
+        'empresa_endereco': empresa_endereco,
+        'cliente_nome': cliente_nome,
+        'cliente_telefone': cliente_telefone,
+        'cliente_endereco': cliente_endereco,
+        'projetos_nome': projetos_nome,
+        'itens': st.session_state.itens.para_dicts(),
+        'desconto': desconto,
+        'prazo': prazo,
+        'pagamento': pagamento,
+        'orcamento_valido_por': orcamento_valido_por,
+        'observacao': observacao,
+        'itens_inclusos': itens_inclusos,
+        'itens_nao_inclusos': itens_nao_inclusos,
+    }
+    # Data do PDF de origem de um orçamento importado: segue no backup e nas versões, e a
+    # análise continua contando o orçamento no mês em que foi feito
+    if st.session_state.get('data_orcamento'):
+        dados_orcamento['data_orcamento'] = st.session_state.data_orcamento
+
+    # Salvamento automático: só agenda quando algo mudou; a gravação fica com a thread de fundo
+    if (st.session_state.itens or cliente_nome) and dados_orcamento != st.session_state.get('autosave_ultimo'):
+        st.session_state.autosave_ultimo = dados_orcamento
+        obter_autosalvamento().agendar(st.session_state.autosave_key,
+                                       {**dados_orcamento, 'salvo_em': datetime.now().isoformat(timespec='seconds')})
+    if 'autosave_ultimo' in st.session_state:
+        st.caption(f"💾 Salvo automaticamente no backup `{st.session_state.autosave_key}`")
+
+    if st.button("📄 Gerar e Baixar PDF", use_container_width=True):
+        obter_cache_pdf().gerar_pdf(dados_orcamento)
+        # Cada PDF gerado vira uma versão no histórico do backup desta sessão
+        historico.salvar_versao(st.session_state.autosave_key, dados_orcamento)
+    # Enquanto o orçamento não mudar, o PDF já gerado continua disponível nos reruns seguintes
+    pdf_bytes = obter_cache_pdf().obter(dados_orcamento)
+    if pdf_bytes:
+        st.download_button(
+            label="📄 Baixar Orçamento em PDF",
+            data=pdf_bytes,
+            file_name=nome_arquivo_pdf(cliente_nome),
+            mime="application/pdf",
+            use_container_width=True
+        )
+
+editor_itens()
+lista_itens()
+totais()
 
 st.sidebar.markdown("---")
-st.sidebar.info("💡 **Dica**: Agora você pode editar itens após adicionar! Clique em 'Editar' em qualquer item.")
\ No newline at end of file
+st.sidebar.info("💡 **Dica**: Agora você pode editar itens após adicionar! Clique em 'Editar' em qualquer item.")
+
+# Painel de medições: tempos por etapa deste rerun, das mais lentas às mais rápidas
+if medicoes:
+    with st.sidebar.expander("⏱️ Desempenho deste rerun", expanded=True):
+        st.write(f"**Total:** {medicoes.total() * 1000:.0f} ms")
+        for nome, (segundos, chamadas) in sorted(medicoes.etapas.items(), key=lambda e: -e[1][0]):
+            st.write(f"- `{nome}`: {segundos * 1000:.1f} ms" + (f" ({chamadas}x)" if chamadas > 1 else ""))
+        for nome, valor in sorted(medicoes.contadores.items()):
+            st.write(f"- `{nome}`: {valor}")
+        # Cliques no editor, na lista e nos totais reexecutam só os fragmentos, sem passar por aqui
+        recentes = st.session_state.pop('medicoes_fragmentos', [])
+        if recentes:
+            st.write("**Fragmentos reexecutados desde o rerun anterior:**")
+            for registro in reversed(recentes):
+                st.write(f"- `{registro['fragmento']}` às {registro['em'][11:]}: {registro['total_s'] * 1000:.0f} ms")
+        arquivo_medicoes = os.path.join(BACKUP_DIR, ARQUIVO_MEDICOES)
+        if st.toggle("Gravar cada rerun em arquivo", key="exportar_medicoes",
+                     help=f"Acrescenta uma linha JSON por rerun em {arquivo_medicoes}"):
+            instrumentacao.exportar_jsonl(medicoes, arquivo_medicoes, sessao=st.session_state.autosave_key)
+            st.caption(f"Gravando em `{arquivo_medicoes}`")
+# As medições deste rerun acabam aqui: um fragmento reexecutado depois abre as suas
+instrumentacao.iniciar(False)
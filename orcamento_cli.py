@@ -0,0 +1,108 @@
+"""Linha de comando para operações em lote sobre os orçamentos.
+
+Exemplos:
+    python orcamento_cli.py gerar-pdfs --saida pdfs/
+    python orcamento_cli.py gerar-pdfs --cliente "João Silva" --zip orcamentos.zip
+    python orcamento_cli.py importar-pdfs pdfs_antigos/
+    python orcamento_cli.py api --porta 8000
+"""
+import os
+import sys
+import time
+import argparse
+
+from backup_store import BACKUP_DIR, BackupStore
+from pdf_orcamento import EMPRESA_NOME_PADRAO
+from extracao_pdf import CacheExtracao, DIRETORIO_CACHE_EXTRACAO
+from lote import listar_backups, gerar_pdfs_em_lote, listar_pdfs, importar_pdfs_em_lote, JA_IMPORTADO
+
+
+def cmd_gerar_pdfs(args):
+    if not args.saida and not args.zip:
+        args.saida = "pdfs"
+    caminhos = listar_backups(args.backups, padrao=args.padrao, cliente=args.cliente)
+    if not caminhos:
+        print("Nenhum backup encontrado.")
+        return 0
+    inicio = time.perf_counter()
+    falhas = gerar_pdfs_em_lote(caminhos, saida_dir=args.saida, zip_path=args.zip, processos=args.processos,
+                                empresa_nome=args.empresa_nome, empresa_endereco=args.empresa_endereco,
+                                backup_dir=args.backups)
+    print(f"{len(caminhos) - len(falhas)} de {len(caminhos)} PDFs gerados em {time.perf_counter() - inicio:.1f}s")
+    for chave, erro in falhas:
+        print(f"  ERRO {chave}: {erro}")
+    return 1 if falhas else 0
+
+
+def cmd_importar_pdfs(args):
+    caminhos = listar_pdfs(args.pasta)
+    if not caminhos:
+        print("Nenhum PDF encontrado.")
+        return 0
+    store = BackupStore(args.backups)
+    cache = None if args.sem_cache else CacheExtracao(diretorio=os.path.join(args.backups, DIRETORIO_CACHE_EXTRACAO))
+    inicio = time.perf_counter()
+    falhas = pulados = 0
+    resultados = importar_pdfs_em_lote([(c, c) for c in caminhos], store, processos=args.processos, cache=cache,
+                                       diagnostico_dir=args.diagnostico, sobrescrever=args.sobrescrever)
+    for n, resultado in enumerate(resultados, 1):
+        status = f"OK -> {resultado['backup']}" if resultado['ok'] else "ERRO"
+        print(f"[{n}/{len(caminhos)}] {os.path.basename(resultado['arquivo'])}: {status} ({resultado['detalhes']})")
+        falhas += not resultado['ok']
+        pulados += resultado['detalhes'] == JA_IMPORTADO
+    print(f"{len(caminhos) - falhas - pulados} de {len(caminhos)} PDFs importados em {time.perf_counter() - inicio:.1f}s")
+    if pulados:
+        print(f"{pulados} já tinham backup e foram pulados (use --sobrescrever para importar de novo)")
+    return 1 if falhas else 0
+
+
+def cmd_api(args):
+    # Importado aqui: os outros comandos não precisam de starlette/uvicorn
+    from api_orcamentos import servir
+    try:
+        servir(args.host, args.porta, args.backups, args.threads)
+    except RuntimeError as e:
+        print(e)
+        return 1
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Operações em lote dos orçamentos")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p = sub.add_parser("gerar-pdfs", help="gera o PDF de cada backup JSON")
+    p.add_argument("--backups", default=BACKUP_DIR, help="diretório dos backups (padrão: %(default)s)")
+    p.add_argument("--padrao", help="filtra as chaves dos backups por padrão glob (ex: 'joao*')")
+    p.add_argument("--cliente", help="só os backups deste cliente")
+    p.add_argument("--saida", help="pasta onde gravar os PDFs (padrão: pdfs/ se --zip não for usado)")
+    p.add_argument("--zip", help="grava todos os PDFs num único arquivo zip")
+    p.add_argument("--processos", type=int, help="número de processos (padrão: todos os núcleos)")
+    p.add_argument("--empresa-nome",
+                   help=f"nome da marcenaria no PDF, no lugar do gravado no backup (sem ele: o do backup, ou {EMPRESA_NOME_PADRAO!r})")
+    p.add_argument("--empresa-endereco", help="endereço da marcenaria no PDF, no lugar do gravado no backup")
+    p.set_defaults(func=cmd_gerar_pdfs)
+
+    p = sub.add_parser("importar-pdfs", help="importa uma pasta de PDFs de orçamento para os backups")
+    p.add_argument("pasta", help="pasta com os PDFs")
+    p.add_argument("--backups", default=BACKUP_DIR, help="diretório dos backups (padrão: %(default)s)")
+    p.add_argument("--processos", type=int, help="número de processos (padrão: todos os núcleos)")
+    p.add_argument("--sem-cache", action="store_true", help="extrai de novo mesmo os PDFs já processados")
+    p.add_argument("--sobrescrever", action="store_true",
+                   help="importa de novo os PDFs que já têm backup, apagando as edições feitas nele")
+    p.add_argument("--diagnostico", metavar="PASTA", help="grava texto, tabelas e tempos por página de cada PDF processado")
+    p.set_defaults(func=cmd_importar_pdfs)
+
+    p = sub.add_parser("api", help="sobe a API HTTP local (JSON -> PDF e PDF -> JSON)")
+    p.add_argument("--host", default="127.0.0.1", help="endereço de escuta (padrão: %(default)s)")
+    p.add_argument("--porta", type=int, default=8000, help="porta (padrão: %(default)s)")
+    p.add_argument("--backups", default=BACKUP_DIR, help="diretório dos backups, do logo e do cache de extração (padrão: %(default)s)")
+    p.add_argument("--threads", type=int, default=4, help="threads para gerar/ler PDFs (padrão: %(default)s)")
+    p.set_defaults(func=cmd_api)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+import streamlit as st
+from datetime import date
+import analise
+from analise import BaseAnalise
+from backup_store import BACKUP_DIR
+from pdf_orcamento import formatar_moeda
+
+# Config da página
+st.set_page_config(page_title="Análise dos Orçamentos", layout="wide")
+st.title("📊 Análise dos Orçamentos")
+
+@st.cache_resource
+def obter_base_analise():
+    # Compartilhada entre sessões: a cada visita só os backups alterados são relidos
+    return BaseAnalise(BACKUP_DIR)
+
+base = obter_base_analise()
+base.sincronizar()
+orcamentos, itens = base.tabelas()
+if orcamentos.empty:
+    st.info("Nenhum orçamento salvo ainda. Os backups aparecem aqui assim que forem gravados.")
+    st.stop()
+
+# Período analisado
+datas = orcamentos['data'].dropna()
+primeira, ultima = (datas.min().date(), datas.max().date()) if len(datas) else (date.today(), date.today())
+periodo = st.sidebar.date_input("Período", value=(primeira, ultima), min_value=primeira, max_value=max(ultima, date.today()),
+                                format="DD/MM/YYYY")
+inicio, fim = (periodo[0], periodo[-1]) if periodo else (None, None)
+incluir_sem_data = st.sidebar.checkbox("Incluir orçamentos sem data", value=True,
+                                       help="Importados de PDFs sem a linha \"Data:\" e backups anteriores ao "
+                                            "salvamento automático. Nunca entram na série mensal.")
+orcamentos, itens = analise.filtrar_periodo(orcamentos, itens, inicio, fim, incluir_sem_data)
+
+totais = analise.resumo(orcamentos)
+col1, col2, col3, col4 = st.columns(4)
+col1.metric("Orçamentos", f"{totais['orcamentos']:,}".replace(',', '.'))
+col2.metric("Valor orçado", formatar_moeda(totais['valor_orcado']))
+col3.metric("Ticket médio", formatar_moeda(totais['ticket_medio']))
+col4.metric("Desconto médio", f"{totais['desconto_medio']:.1f}%".replace('.', ','))
+
+st.subheader("Valor orçado por mês")
+if totais['sem_data']:
+    st.caption(f"{totais['sem_data']} orçamentos sem data ficam fora desta série.")
+mensal = analise.por_mes(orcamentos)
+st.bar_chart(mensal['valor_orcado'], y_label="R$")
+st.dataframe(
+    mensal.rename_axis("Mês").reset_index(),
+    hide_index=True, use_container_width=True,
+    column_config={
+        "Mês": st.column_config.DateColumn(format="MM/YYYY"),
+        "orcamentos": st.column_config.NumberColumn("Orçamentos"),
+        "valor_orcado": st.column_config.NumberColumn("Valor orçado (R$)", format="%.2f"),
+        "desconto_medio": st.column_config.NumberColumn("Desconto médio (%)", format="%.1f"),
+    },
+)
+
+col_a, col_b = st.columns(2)
+with col_a:
+    st.subheader("Clientes com maior valor orçado")
+    st.dataframe(
+        analise.por_cliente(orcamentos).rename_axis("Cliente").reset_index(),
+        hide_index=True, use_container_width=True,
+        column_config={
+            "orcamentos": st.column_config.NumberColumn("Orçamentos"),
+            "valor_orcado": st.column_config.NumberColumn("Valor orçado (R$)", format="%.2f"),
+            "ultimo": st.column_config.DateColumn("Último", format="DD/MM/YYYY"),
+        },
+    )
+with col_b:
+    st.subheader("Materiais mais orçados")
+    materiais = analise.por_material(itens)
+    st.bar_chart(materiais['itens'], horizontal=True)
+    st.dataframe(
+        materiais.rename_axis("Material").reset_index(),
+        hide_index=True, use_container_width=True,
+        column_config={
+            "itens": st.column_config.NumberColumn("Itens"),
+            "quantidade": st.column_config.NumberColumn("Quantidade", format="%d"),
+            "valor": st.column_config.NumberColumn("Valor (R$)", format="%.2f"),
+        },
+    )
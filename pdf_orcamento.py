@@ -0,0 +1,370 @@
+import os
+import copy
+import json
+import hashlib
+import threading
+import tempfile
+from io import BytesIO
+from collections import OrderedDict
+from datetime import datetime
+
+from backup_store import BACKUP_DIR
+from imagens import CacheImagens, caminho_foto
+from instrumentacao import etapa, contar
+from modelo_orcamento import Orcamento
+
+# Dados padrão da empresa (editáveis na barra lateral)
+EMPRESA_NOME_PADRAO = "AW Marcenaria Móveis Sob Medida"
+EMPRESA_ENDERECO_PADRAO = "Rua Brusque, 880, Bairro Glória - Blumenau - SC"
+
+# Textos fixos do final do orçamento
+TEXTO_GARANTIA = "Móveis conforme projetos com garantia de dois anos."
+TEXTO_ASSINATURA = "<u>Att. Genesio e Sidnei</u>"
+
+# Colunas da tabela de itens
+CABECALHO_ITENS = ["Item", "Qtd", "Especificações", "Material", "Subtotal"]
+# Altura mínima de uma linha da tabela (uma linha de texto de 10pt + espaçamentos), em pontos
+ALTURA_MINIMA_LINHA = 22
+# Caixa (em pontos) do logo e da miniatura da foto de cada item
+TAMANHO_LOGO = 72
+TAMANHO_MINIATURA = 90
+# Acima deste tamanho, `gerar_pdf_temporario` passa o PDF da memória para o disco
+LIMITE_PDF_EM_MEMORIA = 1024 * 1024
+
+
+def formatar_moeda(valor):
+    return f"R$ {valor:,.2f}".replace('.', '#').replace(',', '.').replace('#', ',')
+
+
+def localizar_logo(backup_dir=BACKUP_DIR):
+    logo_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Logo.jpg")
+    if not os.path.exists(logo_path):
+        logo_path = os.path.join(backup_dir, "Logo.jpg")
+    return logo_path if os.path.exists(logo_path) else None
+
+
+def _tabela_paginada(modelo, itens):
+    """Tabela de itens montada uma página por vez, com o cabeçalho repetido em cada página.
+
+    Uma única `Table` com centenas de linhas fica inteira na memória até o fim do PDF;
+    aqui só existe a `Table` da página corrente, com as linhas que cabem nela
+    (`repeatRows`/`splitByRow`), e o resto vira uma nova tabela paginada.
+    """
+    from reportlab.platypus import Flowable
+
+    class TabelaPaginada(Flowable):
+        def __init__(self, inicio, bloco=None):
+            super().__init__()
+            self.inicio = inicio
+            # Linhas a medir de uma vez; sem estimativa, o máximo que caberia na página
+            self.bloco = bloco
+            self._espaco = None
+
+        def wrap(self, availWidth, availHeight):
+            if availHeight < 2 * ALTURA_MINIMA_LINHA:
+                # Não cabe nem o cabeçalho com uma linha: vai para a próxima página sem montar o bloco
+                return availWidth, availHeight + 1
+            # O split vem logo depois do wrap com o mesmo espaço: a tabela do bloco é reaproveitada
+            if self._espaco != (availWidth, availHeight):
+                bloco = self.bloco or int(availHeight // ALTURA_MINIMA_LINHA) + 1
+                while True:
+                    self._fim = min(len(itens), self.inicio + bloco)
+                    self._tabela = modelo.tabela_itens(itens[i] for i in range(self.inicio, self._fim))
+                    self._medida = self._tabela.wrap(availWidth, availHeight)
+                    # Um bloco que coube inteiro com itens sobrando deixaria espaço vazio na página
+                    if self._medida[1] > availHeight or self._fim == len(itens):
+                        break
+                    bloco *= 2
+                self._espaco = (availWidth, availHeight)
+            largura, altura = self._medida
+            if self._fim < len(itens):
+                # Ainda há itens depois do bloco: força a quebra para continuar na próxima tabela
+                altura = max(altura, availHeight + 1)
+            return largura, altura
+
+        def split(self, availWidth, availHeight):
+            if availHeight < 2 * ALTURA_MINIMA_LINHA:
+                return []
+            self.wrap(availWidth, availHeight)
+            partes = self._tabela.split(availWidth, availHeight)
+            if not partes:
+                return []
+            usados = len(partes[0]._cellvalues) - 1
+            if self.inicio + usados >= len(itens):
+                return [partes[0]]
+            # A próxima página deve caber mais ou menos o mesmo número de linhas desta
+            return [partes[0], TabelaPaginada(self.inicio + usados, usados + usados // 4 + 2)]
+
+        def draw(self):
+            self._tabela.drawOn(self.canv, 0, 0)
+
+    return TabelaPaginada(0)
+
+
+class ModeloOrcamentoPDF:
+    """Modelo do PDF de orçamento: estilos, logo e textos fixos são montados uma única vez.
+
+    Cada chamada de `gerar_pdf` só cria os elementos que dependem do orçamento. O
+    reportlab é importado só quando o primeiro modelo é criado, não na abertura do app.
+    O logo e as fotos dos itens (em `backup_dir/fotos/`) entram já reduzidos, via
+    `CacheImagens`.
+    """
+
+    def __init__(self, logo_path=None, backup_dir=BACKUP_DIR, imagens=None):
+        from reportlab.lib.styles import getSampleStyleSheet
+        from reportlab.platypus import Paragraph, TableStyle, Spacer
+
+        self.styles = getSampleStyleSheet()
+        self.logo_path = logo_path
+        self.backup_dir = backup_dir
+        self.imagens = imagens or CacheImagens()
+
+        self.estilo_cabecalho = TableStyle([
+            ('ALIGN', (0, 0), (0, 0), 'LEFT'),
+            ('ALIGN', (1, 0), (1, 0), 'RIGHT'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('LEFTPADDING', (0, 0), (-1, -1), 0),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 0),
+            ('TOPPADDING', (0, 0), (-1, -1), 2),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 0),
+        ])
+        self.estilo_itens = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), '#D3D3D3'),
+            ('TEXTCOLOR', (0, 0), (-1, 0), '#000000'),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('GRID', (0, 0), (-1, -1), 1, '#000000'),
+            ('LEFTPADDING', (0, 0), (-1, -1), 5),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 5),
+            ('TOPPADDING', (0, 0), (-1, -1), 5),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
+        ])
+        # Mesmo estilo para as caixas de observações, itens inclusos e não inclusos
+        self.estilo_caixa = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, -1), '#F0F0F0'),
+            ('GRID', (0, 0), (-1, -1), 1, '#000000'),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('LEFTPADDING', (0, 0), (-1, -1), 10),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 10),
+            ('TOPPADDING', (0, 0), (-1, -1), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 10),
+        ])
+
+        # Parágrafos fixos já interpretados; são copiados a cada PDF
+        self._titulo_orcamento = Paragraph("<b>Orçamento</b>", self.styles['Heading2'])
+        self._titulo_condicoes = Paragraph("<b>Condições:</b>", self.styles['Heading2'])
+        self._rodape = [
+            Paragraph(TEXTO_GARANTIA, self.styles['Normal']),
+            Spacer(1, 12),
+            Paragraph(TEXTO_ASSINATURA, self.styles['Normal']),
+        ]
+
+    def _caixa(self, titulo, texto):
+        from reportlab.lib.units import inch
+        from reportlab.platypus import Paragraph, Table
+
+        caixa = Table([[Paragraph(f"<b>{titulo}:</b><br/>{texto}", self.styles['Normal'])]], colWidths=[6*inch])
+        caixa.setStyle(self.estilo_caixa)
+        return caixa
+
+    def _imagem(self, caminho, tamanho):
+        from reportlab.platypus import Image
+
+        reduzida = self.imagens.obter(caminho, tamanho, tamanho)
+        if reduzida is None:
+            return None
+        jpeg, largura, altura = reduzida
+        return Image(BytesIO(jpeg), width=largura, height=altura)
+
+    def tabela_itens(self, itens):
+        """`Table` com o cabeçalho e uma linha por item, repetindo o cabeçalho se quebrar de página."""
+        from reportlab.lib.units import inch
+        from reportlab.platypus import Paragraph, Table, Spacer
+
+        normal = self.styles['Normal']
+        table_data = [CABECALHO_ITENS]
+        for item in itens:
+            full_spec = "<br/>".join(item.especificacoes.split('\n'))
+            celula_item = Paragraph(item.nome, normal)
+            if item.foto:
+                miniatura = self._imagem(caminho_foto(self.backup_dir, item.foto), TAMANHO_MINIATURA)
+                if miniatura:
+                    celula_item = [celula_item, Spacer(1, 4), miniatura]
+            table_data.append([
+                celula_item,
+                str(item.qtd),
+                Paragraph(full_spec, normal),
+                item.material[:15],
+                formatar_moeda(item.subtotal)
+            ])
+        table = Table(table_data, colWidths=[1.5*inch, 0.5*inch, 3*inch, 1.5*inch, 1*inch], repeatRows=1, splitByRow=1)
+        table.setStyle(self.estilo_itens)
+        return table
+
+    def montar_elementos(self, dados):
+        """Monta a lista de flowables do orçamento descrito em `dados`.
+
+        `dados['itens']` pode ser um `Orcamento` ou a lista de dicionários dos backups.
+        """
+        from reportlab.lib.units import inch
+        from reportlab.platypus import Paragraph, Table, Spacer
+
+        styles = self.styles
+        normal = styles['Normal']
+        elements = []
+
+        # Cabeçalho
+        header_data = [[Paragraph(f"<b>{dados.get('empresa_nome', '')}</b>", styles['Heading1']), ""]]
+        logo = self._imagem(self.logo_path, TAMANHO_LOGO)
+        if logo:
+            header_data[0][1] = logo
+        header_table = Table(header_data, colWidths=[5.5*inch, 0.5*inch])
+        header_table.setStyle(self.estilo_cabecalho)
+        elements.append(header_table)
+        elements.append(Paragraph(f"{dados.get('empresa_endereco', '')}", normal))
+        elements.append(Paragraph(f"Data: {datetime.now().strftime('%d/%m/%Y')}", normal))
+        elements.append(Spacer(1, 12))
+
+        # Dados do cliente
+        elements.append(copy.copy(self._titulo_orcamento))
+        elements.append(Paragraph(f"Cliente: {dados.get('cliente_nome') or 'Não especificado'}", normal))
+        elements.append(Paragraph(f"Telefone: {dados.get('cliente_telefone') or 'Não especificado'}", normal))
+        elements.append(Paragraph(f"Endereço: {dados.get('cliente_endereco') or 'Não especificado'}", normal))
+        elements.append(Spacer(1, 12))
+
+        # Tabela de itens
+        orcamento = Orcamento.de(dados.get('itens'))
+        if orcamento:
+            elements.append(_tabela_paginada(self, orcamento))
+
+        # Totais
+        elements.append(Spacer(1, 12))
+        desconto = dados.get('desconto') or 0
+        total = orcamento.total
+        valor_final = orcamento.valor_final(desconto)
+        if desconto > 0:
+            elements.append(Paragraph(f"<b>Total Geral: {formatar_moeda(total)}</b>", styles['Heading2']))
+        elements.append(Paragraph(f"<b>Valor Final: {formatar_moeda(valor_final)}</b>", styles['Heading2']))
+
+        # Condições
+        elements.append(Spacer(1, 24))
+        elements.append(copy.copy(self._titulo_condicoes))
+        elements.append(Paragraph(f"Prazo de entrega: {dados.get('prazo', '')}", normal))
+        elements.append(Paragraph(f"Forma de pagamento: {dados.get('pagamento', '')}", normal))
+        elements.append(Paragraph(f"Orçamento válido por: {dados.get('orcamento_valido_por', '')}", normal))
+
+        # Observações, itens inclusos e não inclusos
+        for titulo, campo in (("Observações", 'observacao'),
+                              ("Itens Inclusos", 'itens_inclusos'),
+                              ("Itens Não Inclusos", 'itens_nao_inclusos')):
+            if dados.get(campo):
+                elements.append(Spacer(1, 12))
+                elements.append(self._caixa(titulo, dados[campo]))
+                elements.append(Spacer(1, 12))
+
+        # Texto final
+        elements.extend(copy.copy(f) for f in self._rodape)
+        if dados.get('projetos_nome'):
+            elements.append(Paragraph(f"Projetos: {dados['projetos_nome']}", normal))
+        return elements
+
+    def gravar_pdf(self, dados, destino):
+        """Renderiza o orçamento no arquivo binário `destino` (aberto para escrita)."""
+        from reportlab.lib.pagesizes import letter
+        from reportlab.platypus import SimpleDocTemplate
+
+        doc = SimpleDocTemplate(destino, pagesize=letter, topMargin=36)
+        with etapa("pdf.montar_elementos"):
+            elementos = self.montar_elementos(dados)
+        with etapa("pdf.doc_build"):
+            doc.build(elementos)
+        contar("pdf.paginas_geradas", doc.page)
+
+    def gerar_pdf(self, dados):
+        """Renderiza o orçamento e devolve os bytes do PDF."""
+        buffer = BytesIO()
+        self.gravar_pdf(dados, buffer)
+        return buffer.getvalue()
+
+    def gerar_pdf_temporario(self, dados):
+        """Renderiza num arquivo temporário que só vai para o disco se passar de LIMITE_PDF_EM_MEMORIA.
+
+        Devolve o arquivo posicionado no início; quem chama deve fechá-lo.
+        """
+        arquivo = tempfile.SpooledTemporaryFile(max_size=LIMITE_PDF_EM_MEMORIA)
+        try:
+            self.gravar_pdf(dados, arquivo)
+        except BaseException:
+            arquivo.close()
+            raise
+        arquivo.seek(0)
+        return arquivo
+
+
+class CachePDF:
+    """PDFs já renderizados, memorizados pelo conteúdo do orçamento (LRU em memória).
+
+    A chave cobre todos os dados do orçamento, a data impressa no PDF e o caminho e
+    mtime do logo; se o logo mudar, o modelo é recriado e os PDFs antigos deixam de casar.
+    """
+
+    def __init__(self, backup_dir=BACKUP_DIR, max_itens=16, imagens=None):
+        self.backup_dir = backup_dir
+        self.max_itens = max_itens
+        self.imagens = imagens or CacheImagens()
+        self._pdfs = OrderedDict()
+        self._lock = threading.Lock()
+        self._logo = None
+        self._modelo = None
+
+    def _logo_atual(self):
+        logo_path = localizar_logo(self.backup_dir)
+        try:
+            return logo_path, os.stat(logo_path).st_mtime_ns if logo_path else None
+        except OSError:
+            return None, None
+
+    def chave(self, dados, logo):
+        dados = {**dados, 'itens': Orcamento.de(dados.get('itens')).para_dicts()}
+        conteudo = json.dumps([dados, logo, datetime.now().strftime('%d/%m/%Y')],
+                              sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(conteudo.encode('utf-8')).hexdigest()
+
+    def obter(self, dados):
+        """Bytes do PDF deste orçamento se já foi renderizado, senão None (não renderiza)."""
+        chave = self.chave(dados, self._logo_atual())
+        with self._lock:
+            pdf_bytes = self._pdfs.get(chave)
+            if pdf_bytes is not None:
+                self._pdfs.move_to_end(chave)
+            return pdf_bytes
+
+    def gerar_pdf(self, dados):
+        """Como `ModeloOrcamentoPDF.gerar_pdf`, mas só renderiza orçamentos ainda não vistos."""
+        logo = self._logo_atual()
+        chave = self.chave(dados, logo)
+        with self._lock:
+            pdf_bytes = self._pdfs.get(chave)
+            if pdf_bytes is not None:
+                self._pdfs.move_to_end(chave)
+                contar("pdf.cache_acerto")
+                return pdf_bytes
+            contar("pdf.cache_falha")
+            if self._modelo is None or logo != self._logo:
+                self._modelo = ModeloOrcamentoPDF(logo[0], self.backup_dir, self.imagens)
+                self._logo = logo
+            modelo = self._modelo
+        pdf_bytes = modelo.gerar_pdf(dados)
+        with self._lock:
+            self._pdfs[chave] = pdf_bytes
+            while len(self._pdfs) > self.max_itens:
+                self._pdfs.popitem(last=False)
+        return pdf_bytes
+
+
+def nome_arquivo_pdf(cliente_nome):
+    data = datetime.now().strftime('%d-%m-%Y')
+    return f"orcamento_{cliente_nome.replace(' ', '_')}_{data}.pdf" if cliente_nome else f"orcamento_{data}.pdf"